@@ -0,0 +1,336 @@
+import contextlib
+import io
+import math
+import os
+import tempfile
+import unittest
+from calc_engine import *
+from batch_eval import evaluate_line, evaluate_stream, main, parallel_evaluate_stream
+from result_cache import PersistentResultCache
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+##
+# @file: UT_calc_engine.py
+# @brief: Unit Tests for the expression evaluation engine for IVS project 2.
+# @author
+# @Created: 2026-10-17
+# @Last Modified: 2026-10-17
+##
+
+class TestCalcEngine(unittest.TestCase):
+
+    def setUp(self):
+        parse_cache.clear()
+
+    # Test Method for 'is_valid_parentheses' function
+    def test_is_valid_parentheses(self):
+        self.assertTrue(is_valid_parentheses("(1+(2×3))"))
+        self.assertFalse(is_valid_parentheses("(1+2"))
+        self.assertFalse(is_valid_parentheses(")1+2("))
+
+    # Test Method for 'custom_eval' function
+    def test_custom_eval(self):
+        self.assertEqual(custom_eval("1+2"), 3)
+        self.assertEqual(custom_eval("2^10"), 1024)
+        self.assertEqual(custom_eval("-(3+4)×-2"), 14)
+        self.assertEqual(custom_eval("((((1+2)×3)-4)÷5)^2"), 9)
+        self.assertAlmostEqual(custom_eval("2^0.5×3"), 3 * math.sqrt(2))
+        self.assertAlmostEqual(custom_eval("ln(10)"), math.log(10))
+        self.assertAlmostEqual(custom_eval("√x(2)"), math.sqrt(2))
+        self.assertIsInstance(custom_eval("3×4"), int)
+
+    def test_custom_eval_errors(self):
+        with self.assertRaises(ValueError):
+            custom_eval("1+")
+        with self.assertRaises(ValueError):
+            custom_eval("5ln")
+        with self.assertRaises(ValueError):
+            custom_eval("(2")
+        with self.assertRaises(ValueError):
+            custom_eval("10^400")
+        with self.assertRaises(ZeroDivisionError):
+            custom_eval("1÷0")
+
+    # Test Method for 'tokenize' function
+    def test_tokenize(self):
+        self.assertEqual(tokenize("+1.5×(2 - .5)^3\n"), (['1.5', '×', '(', '2', '-', '.5', ')', '^', '3'], None))
+        self.assertEqual(tokenize("1.5.5"), (['1.5', '.5'], None))
+        self.assertEqual(tokenize("1+"), (None, 2))
+        self.assertEqual(tokenize("1+2)"), (None, 3))
+        self.assertEqual(tokenize("(1+2"), (None, 0))
+        self.assertEqual(tokenize("1..2"), (None, 2))
+
+    # Test Method for the error positions reported by 'custom_eval'
+    def test_error_position(self):
+        with self.assertRaises(ExpressionSyntaxError) as context:
+            custom_eval("12×(3+)")
+        self.assertEqual(str(context.exception), "Incorrect input")
+        self.assertEqual(context.exception.position, 7)
+        with self.assertRaises(ExpressionSyntaxError) as context:
+            custom_eval("5 ln(2)")
+        self.assertEqual(context.exception.position, 2)
+
+    # Test Method for long inputs that made the former validation regex backtrack exponentially
+    def test_adversarial_input(self):
+        with self.assertRaises(ExpressionSyntaxError) as context:
+            custom_eval("1" * 100000 + "x")
+        self.assertEqual(context.exception.position, 100000)
+
+    # Test Method for the parsed-expression LRU cache
+    def test_parse_cache(self):
+        custom_eval("1+2")
+        custom_eval("1+2")
+        custom_eval("2+3")
+        self.assertEqual(parse_cache.stats()["hits"], 1)
+        self.assertEqual(parse_cache.stats()["misses"], 2)
+
+        cache = ExpressionCache(maxsize=2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        cache.get("a")
+        cache.put("c", 3)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), 1)
+        self.assertEqual(cache.evictions, 1)
+        self.assertEqual(len(cache), 2)
+
+    # Test Method for 'parse_expression' and 'evaluate_program' functions
+    def test_program(self):
+        program = parse_expression("2×(3+4)")
+        self.assertEqual(program, [2.0, 3.0, 4.0, '+', '×'])
+        self.assertEqual(evaluate_program(program), 14)
+        self.assertEqual(evaluate_program(program), 14)
+
+    # Test Method for 'IncrementalParser' class, typing and editing give the programs of parse_expression
+    def test_incremental_parser(self):
+        parser = IncrementalParser()
+        edits = ["1", "12", "12+", "12+3", "12+3×", "12+3×4", "12+3×", "12+3×(", "12+3×(4-1)", "ln(", "ln(5", "ln(5)",
+                 "(1", "(1+", "(1+2)", "(1+2)^2", "2√x", "2√x(", "1÷0", "12+3×(4-1)"]
+        for text in edits:
+            try:
+                expected = parse_expression(text)
+            except ExpressionSyntaxError as e:
+                with self.assertRaises(ExpressionSyntaxError) as context:
+                    parser.parse(text)
+                self.assertEqual(context.exception.position, e.position)
+            else:
+                self.assertEqual(parser.parse(text), expected, text)
+
+        parser = IncrementalParser()
+        parser.parse("12+3×4")
+        self.assertEqual(parser.evaluate("12+3×45"), 147)
+        self.assertEqual(parser.reused, 5)
+        with self.assertRaises(ZeroDivisionError):
+            parser.evaluate("12+3×45÷0")
+
+    # Test Method for chained powers of integer intermediate results, rejected before they are computed
+    def test_power_size(self):
+        for expression in ("99^99^99^99^99", "(1+1)^(99^99)", "(9^9)^100000.0"):
+            with self.assertRaisesRegex(ValueError, "Result is too large."):
+                custom_eval(expression)
+        self.assertEqual(custom_eval("(1+1)^10"), 1024)
+        self.assertEqual(custom_eval("((1+1)^4000)÷((1+1)^3990)"), 1024) # Exact intermediate results below the bound
+
+    # Test Method for the exact-integer mode of 'custom_eval'
+    def test_custom_eval_exact(self):
+        self.assertEqual(custom_eval("99999999999999999×99999999999999999", exact=True),
+                         9999999999999999800000000000000001)
+        self.assertEqual(custom_eval("2^200+1", exact=True), 2 ** 200 + 1)
+        self.assertEqual(custom_eval("x!(25)", exact=True), math.factorial(25))
+        self.assertEqual(custom_eval("6÷3", exact=True), 2)
+        self.assertIsInstance(custom_eval("6÷3", exact=True), int)
+        self.assertEqual(custom_eval("7÷2", exact=True), 3.5)
+        self.assertEqual(custom_eval("2.5×2", exact=True), 5)
+        self.assertEqual(custom_eval("12.5×4-3÷2", exact=True), custom_eval("12.5×4-3÷2"))
+        self.assertEqual(custom_eval("-3^3", exact=True), -27)
+
+        with self.assertRaisesRegex(ZeroDivisionError, "Cannot divide by 0."):
+            custom_eval("1÷0", exact=True)
+        with self.assertRaisesRegex(ValueError, "Result is too large."):
+            custom_eval("2^100000", exact=True)
+        # Integral float exponents are bounded before computing the power as well
+        with self.assertRaisesRegex(ValueError, "too large"):
+            custom_eval("2^3000000000.0", exact=True)
+        self.assertEqual(custom_eval("2^10.0", exact=True), 1024)
+        self.assertEqual(power_result_bits(2, 3000000000.0), 3000000000)
+        self.assertEqual(power_result_bits(2.0, 3000000000.0), 0)
+        self.assertEqual(power_result_bits(2, 0.5), 0)
+        with self.assertRaisesRegex(ValueError, "Result is too large."):
+            custom_eval("x!(5000)", exact=True)
+        with self.assertRaisesRegex(ValueError, "Result is too large."):
+            custom_eval("(2^1100)×1.5", exact=True)
+
+    # Test Method for 'compile_expression' function
+    def test_compile_expression(self):
+        f = compile_expression("x^2 + 3×x - 1")
+        self.assertEqual(f.variables, ("x",))
+        self.assertEqual(f(2), 9)
+        self.assertEqual(f(x=0.5), 0.75)
+        self.assertIs(compile_expression("x^2 + 3×x - 1"), f)
+
+        g = compile_expression("rate×(1+years)÷√x(rate)")
+        self.assertEqual(g.variables, ("rate", "years"))
+        self.assertAlmostEqual(g(4, years=1), 4.0)
+        self.assertEqual(compile_expression("-x^2")(3), 9)
+        with self.assertRaisesRegex(ValueError, "Neg. exp. not allowed"):
+            compile_expression("2^-x")(2)
+        self.assertEqual(compile_expression("ln(x) + x!(x+2)")(1), 6)
+        self.assertEqual(compile_expression("1+2×3")(), 7)
+
+        with self.assertRaisesRegex(ZeroDivisionError, "Cannot divide by 0."):
+            compile_expression("1÷x")(0)
+        with self.assertRaises(ExpressionSyntaxError) as context:
+            compile_expression("x + $")
+        self.assertEqual(context.exception.position, 4)
+        with self.assertRaises(ExpressionSyntaxError):
+            compile_expression("x + if")
+
+    # Test Method for 'evaluate_array' function with the pure-Python backend
+    def test_evaluate_array(self):
+        result = evaluate_array("x^2 + 3×x - 1", {"x": [0, 1, 2, 3.5]}, backend="python", chunk_size=3)
+        self.assertEqual(list(result), [-1, 3, 9, 21.75])
+        self.assertEqual(list(evaluate_array("a×b", {"a": [1, 2], "b": 10}, backend="python")), [10, 20])
+        self.assertEqual(list(evaluate_array("2+3", {}, backend="python")), [5])
+
+        with self.assertRaisesRegex(ZeroDivisionError, "Cannot divide by 0."):
+            evaluate_array("1÷x", {"x": [1, 0]}, backend="python")
+        with self.assertRaisesRegex(ValueError, "Missing values for: y"):
+            evaluate_array("x+y", {"x": [1]})
+        with self.assertRaisesRegex(ValueError, "same length"):
+            evaluate_array("x+y", {"x": [1], "y": [1, 2]})
+
+    # Test Method for 'evaluate_array' function, the NumPy backend matches the pure-Python one
+    @unittest.skipIf(numpy is None, "NumPy is not installed")
+    def test_evaluate_array_numpy(self):
+        columns = {"x": [0.5, 1, 2, 3.5], "k": [0, 1, 3, 5]}
+        for expression in ("x^2 + 3×x - 1", "-x^k + √x(x)", "ln(x) ÷ (k+1)", "x!(k) - x", "(x-2)^k"):
+            expected = evaluate_array(expression, columns, backend="python")
+            result = evaluate_array(expression, columns, backend="numpy")
+            for a, b in zip(expected, result):
+                self.assertAlmostEqual(a, b, places=9)
+
+        with self.assertRaisesRegex(ZeroDivisionError, "Cannot divide by 0."):
+            evaluate_array("1÷x", {"x": [1, 0]}, backend="numpy")
+        with self.assertRaisesRegex(ValueError, "Result is too large."):
+            evaluate_array("x!(x)", {"x": [200]}, backend="numpy")
+
+class TestBatchEval(unittest.TestCase):
+
+    # Test Method for 'evaluate_line' function
+    def test_evaluate_line(self):
+        self.assertEqual(evaluate_line("1+2\n"), ("3", False))
+        self.assertEqual(evaluate_line("  \n"), ("", False))
+        self.assertEqual(evaluate_line("1÷0\n"), ("error: Cannot divide by 0.", True))
+        self.assertEqual(evaluate_line("2^70\n", exact=True), (str(2 ** 70), False))
+
+    # Test Method for 'evaluate_stream' function, one output line per input line
+    def test_evaluate_stream(self):
+        output = io.StringIO()
+        self.assertEqual(evaluate_stream(io.StringIO("1+2\n\nabc\n2^10\n"), output), (4, 1))
+        self.assertEqual(output.getvalue(), "3\n\nerror: Incorrect input\n1024\n")
+
+    # Test Method for 'parallel_evaluate_stream' function, ordered and unordered output
+    def test_parallel_evaluate_stream(self):
+        lines = ["%d+1\n" % i if i % 7 else "1÷0\n" for i in range(100)]
+        serial = io.StringIO()
+        evaluate_stream(lines, serial)
+
+        ordered = io.StringIO()
+        self.assertEqual(parallel_evaluate_stream(lines, ordered, jobs=2, chunk_size=9), (100, 15))
+        self.assertEqual(ordered.getvalue(), serial.getvalue())
+
+        unordered = io.StringIO()
+        self.assertEqual(parallel_evaluate_stream(lines, unordered, jobs=2, chunk_size=9, ordered=False), (100, 15))
+        numbered = sorted((line.split("\t") for line in unordered.getvalue().splitlines()), key=lambda pair: int(pair[0]))
+        self.assertEqual([text for _, text in numbered], serial.getvalue().splitlines())
+
+    # Test Method for a negative --jobs, rejected before a worker pool is started
+    def test_main_rejects_negative_jobs(self):
+        with contextlib.redirect_stderr(io.StringIO()), self.assertRaises(SystemExit):
+            main(["-j", "-1"])
+
+class TestResultCache(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "results.sqlite")
+
+    # Test Method for stored results and errors, which must match a fresh evaluation
+    def test_evaluate(self):
+        with PersistentResultCache(self.path) as cache:
+            for _ in range(2):
+                self.assertEqual(cache.evaluate("1+2"), custom_eval("1+2"))
+                self.assertEqual(cache.evaluate(" 2^0.5 "), custom_eval("2^0.5"))
+                self.assertEqual(cache.evaluate("2^70", exact=True), 2 ** 70)
+                with self.assertRaises(ZeroDivisionError):
+                    cache.evaluate("1÷0")
+                with self.assertRaises(ExpressionSyntaxError) as error:
+                    cache.evaluate("  1+")
+                self.assertEqual(error.exception.position, 4)
+            self.assertEqual((cache.hits, cache.misses), (5, 5))
+
+        # Results survive the session, a new version stamp drops them
+        with PersistentResultCache(self.path) as cache:
+            self.assertEqual(cache.evaluate("2^0.5"), custom_eval("2^0.5"))
+            stats = cache.stats()
+            self.assertEqual((stats["entries"], stats["hits"], stats["total_hits"], stats["total_misses"]), (5, 1, 6, 5))
+        with PersistentResultCache(self.path, version="other") as cache:
+            self.assertEqual(cache.stats()["entries"], 0)
+
+        # Surrounding whitespace gives the result of the normalized expression, whether it is stored or not
+        for i, (first, second) in enumerate(((" +5", "+5"), ("+6", " +6"))):
+            with PersistentResultCache("%s.%d" % (self.path, i)) as cache:
+                self.assertEqual(cache.evaluate(first), custom_eval(second.strip()))
+                self.assertEqual(cache.evaluate(second), custom_eval(second.strip()))
+
+    # Test Method for the eviction of the least recently used results
+    def test_eviction(self):
+        with PersistentResultCache(self.path, maxsize=3) as cache:
+            for expression in ("1+1", "2+2", "3+3"):
+                cache.evaluate(expression)
+            cache.commit()
+            cache.evaluate("1+1") # Used again, so "2+2" is the least recently used one
+            cache.evaluate("4+4")
+            cache.commit()
+            self.assertEqual(cache.evictions, 1)
+            misses = cache.misses
+            cache.evaluate("1+1")
+            cache.evaluate("2+2")
+            self.assertEqual(cache.misses, misses + 1)
+
+    # Test Method for the entries of stats while results are not yet written, also when another session stored them
+    def test_stats_entries(self):
+        with PersistentResultCache(self.path) as first, PersistentResultCache(self.path) as second:
+            second.evaluate("1+1")
+            first.evaluate("1+1")
+            first.evaluate("2+2")
+            first.commit()
+            self.assertEqual(second.stats()["entries"], 2)
+            second.commit()
+            self.assertEqual(second.stats()["entries"], 2)
+        with PersistentResultCache(self.path, maxsize=2) as cache:
+            cache.evaluate("3+3")
+            self.assertEqual(cache.stats()["entries"], 2)
+
+    # Test Method for batch evaluation through the cache, serial and in worker processes
+    def test_batch_eval(self):
+        lines = ["%d×3\n" % (i % 10) if i % 7 else "1÷0\n" for i in range(50)]
+        serial = io.StringIO()
+        evaluate_stream(lines, serial)
+        with PersistentResultCache(self.path) as cache:
+            cached = io.StringIO()
+            self.assertEqual(evaluate_stream(lines, cached, cache=cache), (50, 8))
+        self.assertEqual(cached.getvalue(), serial.getvalue())
+        parallel = io.StringIO()
+        self.assertEqual(parallel_evaluate_stream(lines, parallel, jobs=2, chunk_size=9, cache_path=self.path), (50, 8))
+        self.assertEqual(parallel.getvalue(), serial.getvalue())
+        with PersistentResultCache(self.path) as cache:
+            self.assertEqual(cache.stats()["total_misses"], 11)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+import math
+import unittest
+
+try:
+    from gui import LatencyHistogram
+except ImportError:
+    LatencyHistogram = None
+
+##
+# @file: UT_gui.py
+# @brief: Unit Tests for the latency statistics of the GUI for IVS project 2.
+# @author
+# @Created: 2026-10-17
+# @Last Modified: 2026-10-17
+##
+
+@unittest.skipIf(LatencyHistogram is None, "PyQt5 is not installed")
+class TestLatencyHistogram(unittest.TestCase):
+
+    def setUp(self):
+        self.histogram = LatencyHistogram()
+
+    # Test Method for a histogram without samples
+    def test_empty(self):
+        for percent in (0, 50, 99, 100):
+            self.assertEqual(self.histogram.percentile(percent), 0.0)
+        self.assertEqual(self.histogram.count, 0)
+
+    # Test Method for the bucket of samples just below and just above the bucket edges
+    def test_bucket_boundaries(self):
+        self.histogram.add(0.0)
+        self.histogram.add(LatencyHistogram.MINIMUM)
+        self.assertEqual(self.histogram.counts[0], 2)
+        for index in (1, 10, 100):
+            edge = LatencyHistogram.MINIMUM * LatencyHistogram.RATIO ** index
+            histogram = LatencyHistogram()
+            histogram.add(edge * (1 - 1e-9))
+            histogram.add(edge * (1 + 1e-9))
+            self.assertEqual(histogram.counts[index], 1)
+            self.assertEqual(histogram.counts[index + 1], 1)
+        # Everything above the last edge is collected by the last bucket, whose percentiles are the largest sample
+        self.histogram.add(60.0)
+        self.histogram.add(3600.0)
+        self.assertEqual(self.histogram.counts[-1], 2)
+        self.assertEqual(self.histogram.percentile(75), 3600.0)
+
+    # Test Method for p50 and p99 of latencies of 1 to 100 ms
+    def test_percentiles(self):
+        for milliseconds in range(1, 101):
+            self.histogram.add(milliseconds / 1000)
+        self.assertEqual(self.histogram.count, 100)
+        self.assertAlmostEqual(self.histogram.total, 5.05)
+        # The estimate is the upper edge of the bucket holding the exact percentile, at most RATIO times larger
+        for percent, exact in ((50, 0.050), (99, 0.099)):
+            estimate = self.histogram.percentile(percent)
+            self.assertGreaterEqual(estimate, exact)
+            self.assertLessEqual(estimate, exact * LatencyHistogram.RATIO)
+        self.assertEqual(self.histogram.percentile(100), 0.1)
+        self.assertLessEqual(self.histogram.percentile(0), 0.001 * LatencyHistogram.RATIO)
+
+    # Test Method for a single sample, every percentile is capped by the largest sample
+    def test_single_sample(self):
+        self.histogram.add(0.0123)
+        for percent in (1, 50, 99, 100):
+            self.assertEqual(self.histogram.percentile(percent), 0.0123)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -60,8 +60,13 @@ class TestMathLibrary(unittest.TestCase):
         self.assertAlmostEqual(sqrt(9), 3)
         self.assertAlmostEqual(sqrt(121), 11)
         self.assertAlmostEqual(sqrt(2), math.sqrt(2))
+        for x in (5e-324, 1e-20, 0.25, 1e100, 1.7e308):
+            self.assertAlmostEqual(sqrt(x) / math.sqrt(x), 1, places=15)
+        self.assertEqual(sqrt_batch([4, 9, 121]), [2, 3, 11])
         with self.assertRaises(ValueError):
             sqrt(-1)
+        with self.assertRaises(ValueError):
+            sqrt_batch([4, -1])
 
     # Test Method for 'Power(x^2)' function
     def test_power(self):
@@ -73,6 +78,10 @@ class TestMathLibrary(unittest.TestCase):
         self.assertEqual(power(-2, 2), 4)
         self.assertAlmostEqual(power(2, 0.5), math.sqrt(2))
         self.assertAlmostEqual(power(2, -1), 0.5)
+        self.assertEqual(power(3, 40.0), 3 ** 40)
+        self.assertEqual(power(-3, 41.0), (-3) ** 41)
+        self.assertAlmostEqual(power(2.0, -10.0), 1 / 1024)
+        self.assertEqual(power(2.0, 1e8), math.inf)
 
     # Test Method for 'Factorial(x!)' function
     def test_factorial(self):
@@ -82,13 +91,22 @@ class TestMathLibrary(unittest.TestCase):
         self.assertEqual(factorial(0), 1)
         self.assertEqual(factorial(1), 1)
         self.assertEqual(factorial(5), 120)
+        for n in (20, 21, 170, 1000, 4097):
+            self.assertEqual(factorial(n), math.factorial(n))
         with self.assertRaises(ValueError):
             factorial(-1)
 
     def test_ln(self):
         # Test basic inputs:
-        self.assertEqual(ln(2), 0.6926474305598223)
-        self.assertEqual(ln(1000000), 13.81551055796428)
+        self.assertAlmostEqual(ln(2), math.log(2), places=15)
+        self.assertAlmostEqual(ln(1000000), math.log(1000000), places=13)
+
+        # Test the whole float range:
+        for x in (5e-324, 1e-300, 0.1, 0.75, 1.5, 1e10, 1.7e308):
+            self.assertAlmostEqual(ln(x) / math.log(x), 1, places=14)
+
+        # Test the accuracy/speed knob:
+        self.assertAlmostEqual(ln(2, tolerance=1e-6), math.log(2), places=6)
 
         # Test input near 1:
         self.assertAlmostEqual(ln(1.001), 0.0009995001666249457)
@@ -98,5 +116,12 @@ class TestMathLibrary(unittest.TestCase):
             ln(0)
             ln(-0.001)
 
+        # Test non-finite inputs:
+        self.assertEqual(ln(math.inf), math.inf)
+        with self.assertRaises(ValueError):
+            ln(math.nan)
+        with self.assertRaises(ValueError):
+            ln(-math.inf)
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,162 @@
+import contextlib
+import io
+import json
+import random
+import os
+import pstats
+import statistics
+import tempfile
+import unittest
+from stddev import *
+from profiler import generate_dataset, profiled
+
+##
+# @file: UT_stddev.py
+# @brief: Unit Tests for standard deviation for IVS project 2.
+# @author
+# @Created: 2026-10-17
+# @Last Modified: 2026-10-17
+##
+
+class TestStandardDeviation(unittest.TestCase):
+
+    def setUp(self):
+        rng = random.Random(2023)
+        self.data = [rng.uniform(0, 1000) for _ in range(1000)]
+        self.text = "\n".join(str(x) for x in self.data) + "\n"
+        # Input file of the sharded, mmap and main tests
+        with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False) as handle:
+            handle.write(self.text)
+        self.addCleanup(os.remove, handle.name)
+        self.path = handle.name
+
+    # Test Method for the two-pass 'standard_deviation' function
+    def test_standard_deviation(self):
+        self.assertAlmostEqual(standard_deviation([2, 4, 4, 4, 5, 5, 7, 9]), statistics.stdev([2, 4, 4, 4, 5, 5, 7, 9]), places=5)
+
+    # Test Method for chunked reading, including tokens split across chunks
+    def test_iter_numbers(self):
+        for chunk_size in (1, 3, 7, CHUNK_SIZE):
+            self.assertEqual(list(iter_numbers(io.StringIO("1 22\n333  4.5\n\n-6"), chunk_size)), [1, 22, 333, 4.5, -6])
+
+    # Test Method for 'streaming_standard_deviation' against the two-pass result
+    def test_streaming_standard_deviation(self):
+        expected = standard_deviation(self.data)
+        for chunk_size in (5, 64, CHUNK_SIZE):
+            self.assertAlmostEqual(streaming_standard_deviation(io.StringIO(self.text), chunk_size), expected, places=6)
+
+    # Test Method for the NumPy backend against the pure-Python result
+    @unittest.skipIf(numpy is None, "NumPy is not installed")
+    def test_numpy_standard_deviation(self):
+        self.assertAlmostEqual(numpy_standard_deviation(io.StringIO(self.text)), standard_deviation(self.data), places=6)
+
+    # Test Method for malformed input, which must raise ValueError on every backend instead of truncating the data
+    def test_malformed_input(self):
+        text = "1 2 3 x 4 5\n"
+        with self.assertRaises(ValueError):
+            standard_deviation(read_data(io.StringIO(text)))
+        with self.assertRaises(ValueError):
+            streaming_standard_deviation(io.StringIO(text))
+        if numpy is not None:
+            with self.assertRaises(ValueError):
+                numpy_standard_deviation(io.StringIO(text))
+
+    def test_select_backend(self):
+        self.assertEqual(select_backend("python"), "python")
+        self.assertEqual(select_backend("auto"), "python" if numpy is None else "numpy")
+        with self.assertRaises(ValueError):
+            select_backend("fortran")
+
+    # Test Method for merging partial statistics (Chan's parallel algorithm)
+    def test_merge_statistics(self):
+        whole = running_statistics(self.data)
+        merged = merge_statistics(running_statistics(self.data[:300]), running_statistics(self.data[300:]))
+        self.assertEqual(merged[0], whole[0])
+        self.assertAlmostEqual(merged[1], whole[1])
+        self.assertAlmostEqual(merged[2], whole[2], places=3)
+        self.assertEqual(merge_statistics((0, 0.0, 0.0), whole), whole)
+
+    # Test Method for whitespace aligned shards and the parallel result
+    def test_parallel_standard_deviation(self):
+        for shards in (1, 3, 16):
+            ranges = shard_ranges(self.path, shards)
+            self.assertEqual(ranges[0][0], 0)
+            self.assertEqual(ranges[-1][1], len(self.text))
+            counts = [shard_reduce(running_statistics, self.path, start, end)[0] for start, end in ranges]
+            self.assertEqual(sum(counts), len(self.data))
+        expected = standard_deviation(self.data)
+        self.assertAlmostEqual(parallel_standard_deviation(self.path, 1), expected, places=6)
+        self.assertAlmostEqual(parallel_standard_deviation(self.path, 2), expected, places=6)
+
+    # Test Method for the memory-mapped input path
+    def test_mmap_standard_deviation(self):
+        data = read_mmap(self.path)
+        self.assertEqual(data.typecode, "d")
+        self.assertEqual(list(data), [float(str(x)) for x in self.data])
+        self.assertAlmostEqual(mmap_standard_deviation(self.path, "python"), standard_deviation(self.data), places=6)
+
+    # Test Method for option combinations that main would otherwise silently ignore or fail on
+    def test_main_rejects_ignored_options(self):
+        for argv in (["data.txt", "--stream"], ["data.txt", "--backend", "numpy"], ["data.txt", "--backend", "python"],
+                     ["--mmap"], ["data.txt", "-j", "-1"]):
+            with contextlib.redirect_stderr(io.StringIO()), self.assertRaises(SystemExit):
+                main(argv)
+
+    def test_streaming_errors(self):
+        with self.assertRaises(ValueError):
+            streaming_standard_deviation(io.StringIO(""))
+        with self.assertRaises(ZeroDivisionError):
+            streaming_standard_deviation(io.StringIO("42"))
+
+    # Test Method for the single-pass moments against two-pass definitions, merged shards and the --summary output
+    def test_summary(self):
+        moments = running_moments(self.data)
+        summary = summary_from_moments(moments)
+        n = len(self.data)
+        mean = statistics.fmean(self.data)
+        m2, m3, m4 = (sum((x - mean) ** k for x in self.data) for k in (2, 3, 4))
+        self.assertEqual((summary["count"], summary["min"], summary["max"]), (n, min(self.data), max(self.data)))
+        self.assertAlmostEqual(summary["mean"], mean, places=9)
+        self.assertAlmostEqual(summary["variance"], statistics.variance(self.data), places=6)
+        self.assertAlmostEqual(summary["stddev"], standard_deviation(self.data), places=6)
+        self.assertAlmostEqual(summary["skewness"], n ** 0.5 * m3 / m2 ** 1.5, places=9)
+        self.assertAlmostEqual(summary["kurtosis"], n * m4 / m2 ** 2 - 3, places=9)
+
+        merged = (0, 0.0, 0.0, 0.0, 0.0, None, None)
+        for start in range(0, n, 333):
+            merged = merge_moments(merged, running_moments(self.data[start:start + 333]))
+        for value, expected in zip(merged, moments):
+            self.assertAlmostEqual(value, expected, delta=abs(expected) * 1e-12)
+
+        for argv in ([self.path, "--summary", "-j", "2"], [self.path, "--summary", "--mmap"]):
+            output = io.StringIO()
+            with contextlib.redirect_stdout(output):
+                main(argv)
+            result = json.loads(output.getvalue())
+            self.assertEqual(result["count"], n)
+            self.assertAlmostEqual(result["kurtosis"], summary["kurtosis"], places=9)
+
+        self.assertEqual(summary_from_moments(running_moments([4.0, 4.0]))["skewness"], None)
+        self.assertEqual(summary_from_moments(running_moments([4.0]))["variance"], None)
+        with self.assertRaises(ValueError):
+            summary_from_moments(running_moments([]))
+
+    # Test Method for the --profile option writing the CPU profile and the allocation summary
+    def test_profile(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        prefix = os.path.join(directory.name, "stddev")
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output), contextlib.redirect_stderr(io.StringIO()):
+            main([self.path, "--profile", prefix, "--profile-top", "5"])
+        self.assertAlmostEqual(float(output.getvalue()), standard_deviation(self.data), places=6)
+        functions = [function for _, _, function in pstats.Stats(prefix + ".pstats").stats]
+        self.assertIn("running_statistics", functions)
+        with open(prefix + ".alloc.txt") as summary:
+            self.assertTrue(summary.readline().startswith("peak traced memory:"))
+        with profiled(None):
+            pass
+        self.assertEqual(list(generate_dataset(100)), list(generate_dataset(100)))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,247 @@
+#!/usr/bin/python3
+
+##
+# @file: batch_eval.py
+# @brief: Batch evaluation of expressions for IVS project 2.
+# @author: X
+# @Created: 2026-10-17
+# @Last Modified: 2026-10-17
+##
+
+# @brief: Evaluating one expression per line with custom_eval, without the GUI
+
+import argparse
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from calc_engine import custom_eval
+from profiler import PROFILE_TOP, profiled
+from result_cache import PersistentResultCache, default_cache_path
+
+# Number of lines sent to a worker process at once
+CHUNK_LINES = 2000
+
+# Result caches of a worker process by path, opened by its first chunk
+_worker_caches = {}
+
+
+##
+# @brief: Evaluates one line of the input
+# @param line: Line containing one expression
+# @param exact: Evaluate in the exact-integer mode of custom_eval
+# @param cache: PersistentResultCache used instead of evaluating again, None evaluates every line
+# @return: Tuple (output text, error flag); empty lines give an empty output
+#
+def evaluate_line(line, exact=False, cache=None):
+    expression = line.strip()
+    if not expression:
+        return "", False
+    try:
+        if cache is not None:
+            return str(cache.evaluate(expression, exact)), False
+        return str(custom_eval(expression, exact)), False
+    except Exception as e:
+        return "error: " + str(e), True
+
+##
+# @brief: Evaluates lines one by one and writes one output line per input line
+# @param lines: Iterable of lines, consumed lazily
+# @param output: Text stream receiving the results
+# @param exact: Evaluate in the exact-integer mode of custom_eval
+# @param cache: PersistentResultCache used instead of evaluating again, None evaluates every line
+# @return: Tuple (number of lines, number of errors)
+#
+def evaluate_stream(lines, output, exact=False, cache=None):
+    count = 0
+    errors = 0
+    for line in lines:
+        text, error = evaluate_line(line, exact, cache)
+        output.write(text + "\n")
+        count += 1
+        errors += error
+    return count, errors
+
+##
+# @brief: Splits lines into lists of at most size lines
+# @param lines: Iterable of lines, consumed lazily
+# @param size: Maximal number of lines in a chunk
+# @return: Generator yielding lists of lines
+#
+def iter_chunks(lines, size):
+    chunk = []
+    for line in lines:
+        chunk.append(line)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+##
+# @brief: Evaluates a chunk of lines, executed in a worker process
+# @param lines: List of lines
+# @param exact: Evaluate in the exact-integer mode of custom_eval
+# @param cache_path: Path to the PersistentResultCache shared by the workers, None evaluates every line
+# @return: Tuple (list of output texts, number of errors)
+#
+def evaluate_chunk(lines, exact=False, cache_path=None):
+    cache = None
+    if cache_path is not None:
+        cache = _worker_caches.get(cache_path)
+        if cache is None:
+            cache = _worker_caches[cache_path] = PersistentResultCache(cache_path)
+    texts = []
+    errors = 0
+    for line in lines:
+        text, error = evaluate_line(line, exact, cache)
+        texts.append(text)
+        errors += error
+    if cache is not None:
+        cache.commit() # The worker process may be stopped without closing the cache
+    return texts, errors
+
+##
+# @brief: Evaluates lines in chunks on a pool of worker processes
+# @param lines: Iterable of lines, consumed lazily
+# @param output: Text stream receiving the results
+# @param jobs: Number of worker processes, defaults to the number of CPUs
+# @param chunk_size: Number of lines sent to a worker at once
+# @param ordered: Write the results in input order; otherwise chunks are written as soon as they are done
+#                 and every output line is prefixed with its line number and a tab
+# @param exact: Evaluate in the exact-integer mode of custom_eval
+# @param cache_path: Path to a PersistentResultCache shared by the workers, None evaluates every line
+# @return: Tuple (number of lines, number of errors)
+#
+def parallel_evaluate_stream(lines, output, jobs=None, chunk_size=CHUNK_LINES, ordered=True, exact=False,
+                             cache_path=None):
+    jobs = jobs or os.cpu_count() or 1
+    window = 4 * jobs # Chunks in flight, bounds the memory used for pending results
+    count = 0
+    errors = 0
+
+    ##
+    # @brief: Writes the results of a finished chunk
+    # @param first_line: Line number of the first line of the chunk
+    # @param future: Finished future returned by evaluate_chunk
+    #
+    def write(first_line, future):
+        nonlocal count, errors
+        texts, chunk_errors = future.result()
+        if ordered:
+            output.write("".join(text + "\n" for text in texts))
+        else:
+            output.write("".join("%d\t%s\n" % (first_line + i, text) for i, text in enumerate(texts)))
+        count += len(texts)
+        errors += chunk_errors
+
+    ##
+    # @brief: Waits for at least one chunk in flight and writes its results
+    # @param pending: Chunks in flight, a deque of (first line, future) in order or a dict future -> first line
+    #
+    def drain(pending):
+        if ordered:
+            write(*pending.popleft())
+        else:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                write(pending.pop(future), future)
+
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        pending = deque() if ordered else {}
+        first_line = 1
+        for chunk in iter_chunks(lines, chunk_size):
+            future = pool.submit(evaluate_chunk, chunk, exact, cache_path)
+            if ordered:
+                pending.append((first_line, future))
+            else:
+                pending[future] = first_line
+            first_line += len(chunk)
+            while len(pending) >= window:
+                drain(pending)
+        while pending:
+            drain(pending)
+    return count, errors
+
+##
+# @brief: Summarizes the use of the result cache during a run, including the lookups of worker processes
+# @param before: PersistentResultCache.stats() at the start of the run
+# @param after: PersistentResultCache.stats() at the end of the run
+# @return: One line report
+#
+def cache_report(before, after):
+    hits = after["total_hits"] - before["total_hits"]
+    misses = after["total_misses"] - before["total_misses"]
+    rate = hits / (hits + misses) if hits + misses else 0.0
+    return "result cache: %d entries, %d hits, %d misses (%.1f %% hit rate), %.1f %% hit rate overall" % (
+        after["entries"], hits, misses, rate * 100, after["total_hit_rate"] * 100)
+
+##
+# @brief: Parsing arguments, evaluating expressions from a file or standard input to standard output
+# @param argv: Command line arguments, defaults to sys.argv
+# @return: Exit status, 1 if any line failed to evaluate
+#
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Evaluate one expression per line with the calculator semantics.")
+    parser.add_argument("file", nargs="?", help="input file, standard input is used when omitted")
+    parser.add_argument("-j", "--jobs", type=int, default=1,
+                        help="number of worker processes, 0 uses all CPUs, default %(default)s evaluates serially")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_LINES,
+                        help="number of lines sent to a worker process at once")
+    parser.add_argument("--unordered", action="store_true",
+                        help="write chunks as soon as they are done, prefixing each line with its line number and a tab")
+    parser.add_argument("--exact", action="store_true",
+                        help="keep integers exact instead of converting every operand to float")
+    parser.add_argument("--cache", nargs="?", const=default_cache_path(), metavar="PATH",
+                        help="reuse results stored by earlier runs and GUI sessions in the persistent result cache, "
+                             "default %(const)s")
+    parser.add_argument("-q", "--quiet", action="store_true", help="do not report the throughput on standard error")
+    parser.add_argument("--profile", metavar="PREFIX",
+                        help="profile the run with cProfile and tracemalloc, writing PREFIX.pstats, PREFIX.cpu.txt "
+                             "and PREFIX.alloc.txt; worker processes are not profiled, use it without --jobs")
+    parser.add_argument("--profile-top", type=int, default=PROFILE_TOP,
+                        help="number of functions and allocation sites in the profile summaries")
+    args = parser.parse_args(argv)
+    if args.jobs < 0:
+        parser.error("--jobs must be a positive number of worker processes or 0 for all CPUs")
+
+    ##
+    # @brief: Evaluates the input with the selected strategy
+    # @param lines: Iterable of lines
+    # @return: Tuple (number of lines, number of errors)
+    #
+    def run(lines):
+        if args.jobs == 1 and not args.unordered:
+            return evaluate_stream(lines, sys.stdout, args.exact, cache)
+        return parallel_evaluate_stream(lines, sys.stdout, args.jobs or None, args.chunk_size, not args.unordered,
+                                        args.exact, args.cache)
+
+    # Serial runs use this cache, parallel runs only read the statistics the workers wrote to it
+    cache = PersistentResultCache(args.cache) if args.cache else None
+    if cache is not None:
+        before = cache.stats()
+    start = time.perf_counter()
+    with profiled(args.profile, args.profile_top):
+        if args.file:
+            with open(args.file, encoding="utf-8") as handle:
+                count, errors = run(handle)
+        else:
+            count, errors = run(sys.stdin)
+        sys.stdout.flush()
+        elapsed = time.perf_counter() - start # Without writing the profile
+
+    if cache is not None:
+        after = cache.stats()
+        cache.close()
+    if not args.quiet:
+        rate = count / elapsed if elapsed > 0 else float("inf")
+        print("%d lines, %d errors in %.3f s (%.0f lines/s)" % (count, errors, elapsed, rate), file=sys.stderr)
+        if cache is not None:
+            print(cache_report(before, after), file=sys.stderr)
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,309 @@
+#!/usr/bin/python3
+
+##
+# @file: benchmark.py
+# @brief: Benchmarks for the math libraries, the expression evaluator and the standard deviation of IVS project 2.
+# @author: X
+# @Created: 2026-10-17
+# @Last Modified: 2026-10-17
+##
+
+import argparse
+import functools
+import json
+import platform
+import random
+import re
+import sys
+import time
+import timeit
+
+import extended_math_lib
+import math_lib
+import stddev
+from calc_engine import compile_expression, custom_eval, evaluate_array, parse_cache, tokenize
+
+# Expressions evaluated by the custom_eval benchmarks
+EXPRESSION_CORPUS = [
+    "1+2",
+    "12.5×4-3÷2",
+    "(1+2)×(3+4)÷(5-6)",
+    "2^10",
+    "2^0.5×3",
+    "-(3+4)×-2",
+    "((((1+2)×3)-4)÷5)^2",
+    "1.5+2.5+3.5+4.5+5.5+6.5+7.5+8.5+9.5",
+    "100÷7×7-100",
+    "9^9+8^8+7^7+6^6",
+    "ln(10)",
+    "√x(2)",
+]
+
+# Validation regex used by custom_eval before the single-pass scanner, kept as the benchmark reference
+LEGACY_VALIDATION_PATTERN = re.compile(r'^\s*[\-+\(\)]?(\d+(\.\d+)?|\.\d+|\()+\s*([\+\-\*/\^\(\)×÷]+\s*[\-+\(\)]?\s*(\d+(\.\d+)?|\.\d+|\()+\s*)*\)?$')
+
+# Long inputs that made the validation regex backtrack, as functions of the input length
+ADVERSARIAL_INPUTS = {
+    "digits then junk": lambda n: "1" * n + "x",
+    "operand then junk": lambda n: "1+" + "1" * (n - 3) + "x",
+    "subexpressions": lambda n: "1+(2" * (n // 4) + "x",
+    "nested parentheses": lambda n: "(" * (n // 2) + "1" + ")" * (n // 2 - 1),
+}
+
+# Input sizes of the standard deviation benchmarks
+STDDEV_SIZES = (10, 1000, 100000)
+
+# Relative slowdown reported as a regression by --compare
+THRESHOLD = 0.10
+
+
+##
+# @brief: Previous implementation of power for integral float exponents, kept as the benchmark reference
+# @param base: First operand
+# @param exponent: Integral float exponent
+# @return: Power of base by exponent, computed with one multiplication per unit of the exponent
+#
+def loop_power(base, exponent):
+    exponent = int(exponent)
+    result = 1
+    for i in range(abs(exponent)):
+        result *= base
+    if exponent < 0:
+        return 1 / result
+    return result
+
+##
+# @brief: Time a function call
+# @param func: Function to call
+# @param args: Arguments of the call
+# @param min_time: Minimal total time in seconds spent repeating the call
+# @return: Best time of a single call in seconds
+#
+def time_call(func, *args, min_time=0.2):
+    timer = timeit.Timer(lambda: func(*args))
+    number, elapsed = timer.autorange()
+    repeats = max(1, min(5, int(min_time / elapsed)))
+    return min(timer.repeat(repeat=repeats, number=number)) / number
+
+##
+# @brief: Compare exponentiation by squaring with the multiplication loop across exponent sizes
+# @param exponents: Integral exponents to measure
+# @param base: Base of the power
+# @return: List of (exponent, loop time, squaring time) tuples in seconds
+#
+def bench_power(exponents=(10, 100, 1000, 10000, 100000), base=1.0000001):
+    results = []
+    for exponent in exponents:
+        loop_time = time_call(loop_power, base, float(exponent))
+        squaring_time = time_call(extended_math_lib.power, base, float(exponent))
+        results.append((exponent, loop_time, squaring_time))
+    return results
+
+##
+# @brief: Time the validation of long adversarial inputs with the scanner and the legacy regex
+# @param lengths: Input lengths measured with the scanner
+# @param legacy_lengths: Input lengths measured with the legacy regex, which grows exponentially
+# @return: List of (input name, length, scanner time, legacy regex time or None) tuples in seconds
+#
+def bench_adversarial(lengths=(100, 1000, 10000, 100000), legacy_lengths=(12, 16, 20)):
+    results = []
+    for name, make_input in ADVERSARIAL_INPUTS.items():
+        for length in sorted(set(lengths) | set(legacy_lengths)):
+            text = make_input(length)
+            scanner_time = time_call(tokenize, text, min_time=0.05)
+            legacy_time = None
+            if length in legacy_lengths:
+                legacy_time = time_call(LEGACY_VALIDATION_PATTERN.match, text, min_time=0.05)
+            results.append((name, length, scanner_time, legacy_time))
+    return results
+
+##
+# @brief: Time keystrokes in the calculator window, including the synchronous repaint of the display
+# @param keys: Button texts clicked in order, the display is cleared before every round
+# @param rounds: Number of times the keys are clicked
+# @return: List of times of single keystrokes in seconds
+#
+# PyQt5 is imported here so that the other benchmarks run without it; without a display,
+# set QT_QPA_PLATFORM=offscreen.
+#
+def bench_keystrokes(keys="12345.6789+12345.678", rounds=200):
+    from PyQt5.QtWidgets import QApplication
+    import gui
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    calc = gui.Calculator()
+    times = []
+    for _ in range(rounds):
+        calc._buttonClicked("C")
+        for key in keys:
+            start = time.perf_counter()
+            calc._buttonClicked(key)
+            calc.display.repaint()
+            times.append(time.perf_counter() - start)
+    calc.close()
+    app.processEvents()
+    return times
+
+##
+# @brief: Evaluate every expression of the corpus
+# @param evaluate: Evaluation function, e.g. custom_eval
+# @param corpus: List of expressions
+#
+def _evaluate_corpus(evaluate, corpus):
+    for expression in corpus:
+        evaluate(expression)
+
+##
+# @brief: Evaluate every expression of the corpus with an empty parse cache
+# @param evaluate: Evaluation function, e.g. custom_eval
+# @param cache: Cache cleared before the evaluation
+# @param corpus: List of expressions
+#
+def _evaluate_corpus_cold(evaluate, cache, corpus):
+    cache.clear()
+    for expression in corpus:
+        evaluate(expression)
+
+##
+# @brief: Build the list of benchmarks
+# @param sizes: Input sizes of the standard deviation benchmarks
+# @return: List of (name, function, arguments) tuples
+#
+def collect_benchmarks(sizes=STDDEV_SIZES):
+    benchmarks = [
+        ("math_lib.add", math_lib.add, (123456.789, 987654.321)),
+        ("math_lib.sub", math_lib.sub, (123456.789, 987654.321)),
+        ("math_lib.mul", math_lib.mul, (123456.789, 987654.321)),
+        ("math_lib.div", math_lib.div, (123456.789, 987654.321)),
+        ("extended_math_lib.factorial(20)", extended_math_lib.factorial, (20,)),
+        ("extended_math_lib.factorial(1000)", extended_math_lib.factorial, (1000,)),
+        ("extended_math_lib.power(x, 1000.0)", extended_math_lib.power, (1.0000001, 1000.0)),
+        ("extended_math_lib.power(x, 0.5)", extended_math_lib.power, (2.0, 0.5)),
+        ("extended_math_lib.sqrt(2)", extended_math_lib.sqrt, (2.0,)),
+        ("extended_math_lib.sqrt(1e300)", extended_math_lib.sqrt, (1e300,)),
+        ("extended_math_lib.ln(2)", extended_math_lib.ln, (2.0,)),
+        ("extended_math_lib.ln(1e300)", extended_math_lib.ln, (1e300,)),
+    ]
+
+    benchmarks.append(("custom_eval(corpus)", _evaluate_corpus, (custom_eval, EXPRESSION_CORPUS)))
+    benchmarks.append(("custom_eval(corpus, cold cache)", _evaluate_corpus_cold,
+                       (custom_eval, parse_cache, EXPRESSION_CORPUS)))
+    benchmarks.append(("custom_eval(corpus, exact)", _evaluate_corpus,
+                       (functools.partial(custom_eval, exact=True), EXPRESSION_CORPUS)))
+
+    polynomial = compile_expression("x^2 + 3×x - 1")
+    benchmarks.append(("custom_eval(2^2 + 3×2 - 1)", custom_eval, ("2^2 + 3×2 - 1",)))
+    benchmarks.append(("compile_expression(x^2 + 3×x - 1)(2)", polynomial, (2.0,)))
+    column = [i / 1000 for i in range(100000)]
+    benchmarks.append(("evaluate_array(x^2 + 3×x - 1, 100000)", evaluate_array, ("x^2 + 3×x - 1", {"x": column})))
+
+    rng = random.Random(2023)
+    for size in sizes:
+        data = [float(rng.randint(1, 999)) for _ in range(size)]
+        benchmarks.append(("stddev.standard_deviation(%d)" % size, stddev.standard_deviation, (data,)))
+    return benchmarks
+
+##
+# @brief: Run the benchmarks
+# @param benchmarks: List of (name, function, arguments) tuples
+# @param pattern: Only benchmarks whose name contains pattern are run
+# @return: Dictionary mapping benchmark names to the best time of one call in seconds
+#
+def run_benchmarks(benchmarks, pattern=""):
+    results = {}
+    for name, func, args in benchmarks:
+        if pattern in name:
+            results[name] = time_call(func, *args)
+            print("%-45s %12.3e s" % (name, results[name]), file=sys.stderr)
+    return results
+
+##
+# @brief: Compare results with a baseline
+# @param results: Dictionary mapping benchmark names to times
+# @param baseline: Dictionary mapping benchmark names to times
+# @param threshold: Relative slowdown reported as a regression
+# @return: List of (name, baseline time, time, ratio, regression flag) tuples for benchmarks present in both
+#
+def compare_results(results, baseline, threshold=THRESHOLD):
+    rows = []
+    for name, seconds in results.items():
+        if name in baseline:
+            ratio = seconds / baseline[name]
+            rows.append((name, baseline[name], seconds, ratio, ratio > 1 + threshold))
+    return rows
+
+##
+# @brief: Read benchmark results from a JSON file
+# @param path: Path of the JSON file written by save_results
+# @return: Dictionary mapping benchmark names to times
+#
+def load_results(path):
+    with open(path) as handle:
+        return {name: entry["seconds"] for name, entry in json.load(handle)["results"].items()}
+
+##
+# @brief: Write benchmark results to a JSON file
+# @param path: Path of the JSON file
+# @param results: Dictionary mapping benchmark names to times
+#
+def save_results(path, results):
+    document = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": {name: {"seconds": seconds} for name, seconds in results.items()},
+    }
+    with open(path, "w") as handle:
+        json.dump(document, handle, indent=2, sort_keys=True)
+        handle.write("\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks for the math libraries, custom_eval and stddev.")
+    parser.add_argument("--save", metavar="PATH", help="write the results as a JSON baseline")
+    parser.add_argument("--compare", metavar="PATH", help="compare the results with a JSON baseline")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD,
+                        help="relative slowdown reported as a regression, default %(default)s")
+    parser.add_argument("--filter", default="", help="only run benchmarks whose name contains this text")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(STDDEV_SIZES),
+                        help="input sizes of the standard deviation benchmarks")
+    parser.add_argument("--power", action="store_true",
+                        help="compare exponentiation by squaring with the multiplication loop and exit")
+    parser.add_argument("--exponents", type=int, nargs="+", default=[10, 100, 1000, 10000, 100000],
+                        help="integral exponents used by --power")
+    parser.add_argument("--adversarial", action="store_true",
+                        help="time the validation of long adversarial inputs with the scanner and the legacy regex and exit")
+    parser.add_argument("--keystrokes", action="store_true",
+                        help="time keystrokes and display repaints in the calculator window (needs PyQt5) and exit")
+    args = parser.parse_args()
+
+    if args.keystrokes:
+        times = sorted(bench_keystrokes())
+        print("%d keystrokes: mean %.1f us, median %.1f us, p95 %.1f us" % (
+            len(times), sum(times) / len(times) * 1e6, times[len(times) // 2] * 1e6, times[int(len(times) * 0.95)] * 1e6))
+        sys.exit(0)
+
+    if args.adversarial:
+        print("%-20s %8s %14s %14s %16s" % ("input", "length", "scanner [s]", "ns/char", "legacy regex [s]"))
+        for name, length, scanner_time, legacy_time in bench_adversarial():
+            legacy = "%16.3e" % legacy_time if legacy_time is not None else "%16s" % "-"
+            print("%-20s %8d %14.3e %14.1f %s" % (name, length, scanner_time, scanner_time / length * 1e9, legacy))
+        sys.exit(0)
+
+    if args.power:
+        print("%10s %14s %14s %10s" % ("exponent", "loop [s]", "squaring [s]", "speedup"))
+        for exponent, loop_time, squaring_time in bench_power(args.exponents):
+            print("%10d %14.3e %14.3e %9.1fx" % (exponent, loop_time, squaring_time, loop_time / squaring_time))
+        sys.exit(0)
+
+    results = run_benchmarks(collect_benchmarks(args.sizes), args.filter)
+    if args.save:
+        save_results(args.save, results)
+
+    if args.compare:
+        regressions = 0
+        print("%-45s %12s %12s %8s" % ("benchmark", "baseline [s]", "current [s]", "ratio"))
+        for name, old, new, ratio, regression in compare_results(results, load_results(args.compare), args.threshold):
+            regressions += regression
+            print("%-45s %12.3e %12.3e %7.2fx%s" % (name, old, new, ratio, "  REGRESSION" if regression else ""))
+        sys.exit(1 if regressions else 0)
@@ -0,0 +1,1263 @@
+#!/usr/bin/python3
+
+##
+# @file: calc_engine.py
+# @brief: Expression evaluation engine for IVS project 2, usable without the GUI.
+# @author Michal Petrán
+# @Created: 22-03-2023
+# @Last Modified: 17-10-2026
+##
+
+
+# Import necessary libraries
+import keyword  # Provides the list of Python keywords, which can not be used as variable names
+import math  # Provides lgamma, which bounds the size of exact factorials
+import re  # Provides regular expression support for pattern matching in strings
+from array import array  # Provides the compact float arrays returned by evaluate_array without NumPy
+from collections import OrderedDict  # Provides the ordered mapping backing the parsed-expression LRU cache
+from itertools import repeat  # Provides constant columns for evaluate_array
+from math_lib import add, sub, mul, div  # Import basic math functions from custom math_lib module
+from extended_math_lib import factorial, power, sqrt, ln  # Import extended math functions from custom extended_math_lib module
+
+
+##
+# @brief: Raised for malformed expressions, carries the position of the error
+# @param ValueError: Parent class
+#
+class ExpressionSyntaxError(ValueError):
+    ##
+    # @brief: Initialize the error
+    # @param self: Instance of the ExpressionSyntaxError class
+    # @param message: Error message, str() of the error is the message alone
+    # @param position: Index of the offending character in the expression
+    #
+    def __init__(self, message, position):
+        super().__init__(message)
+        self.position = position
+
+
+##
+# @brief: Checks if the parentheses in the given string are valid
+# @param s: String containing the expression
+# @return Boolean: value indicating whether the parentheses are valid or not
+#
+def is_valid_parentheses(s):
+    stack = [] # Initialize an empty stack
+    for c in s:
+        if c == '(': # If an opening parenthesis is found, add it to the stack
+            stack.append(c)
+        elif c == ')': # If a closing parenthesis is found
+            if not stack: # If the stack is empty, parentheses are not balanced
+                return False
+            stack.pop() # Remove the last opening parenthesis from the stack
+    return not stack # Return True if the stack is empty, otherwise False
+ 
+
+# Define the supported binary operations
+operations = {
+    '+': add,
+    '-': sub,
+    '×': mul,
+    '÷': div,
+    '^': power,
+}
+
+# Define the supported single-operand operations
+single_operand_operations = {
+    'x!': factorial,
+    '√x': sqrt,
+    'ln': ln
+}
+
+# Define the operator precedences used by the shunting-yard parser
+precedences = {'+': 1, '-': 1, '×': 2, '÷': 2, '^': 3, 'u-': 4}
+
+
+##
+# @brief: Bounded LRU cache with hit/miss/eviction counters
+#
+# The cache can be shared by threads, e.g. the evaluation workers of the GUI: an entry evicted by another
+# thread during a lookup is reported as a miss. The counters may then be slightly off, the entries never are.
+#
+class ExpressionCache:
+    ##
+    # @brief: Initialize an empty cache
+    # @param self: Instance of the ExpressionCache class
+    # @param maxsize: Maximum number of entries kept before the least recently used one is evicted
+    #
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self._entries = OrderedDict() # Keeps the entries ordered from least to most recently used
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    ##
+    # @brief: Look up a cached entry and mark it as most recently used
+    # @param self: Instance of the ExpressionCache class
+    # @param key: Key of the entry
+    # @return: The cached value or None if the key is not cached
+    #
+    def get(self, key):
+        try:
+            value = self._entries[key]
+            self._entries.move_to_end(key)
+        except KeyError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return value
+
+    ##
+    # @brief: Store an entry, evicting the least recently used one if the cache is full
+    # @param self: Instance of the ExpressionCache class
+    # @param key: Key of the entry
+    # @param value: Value to store
+    #
+    def put(self, key, value):
+        if self.maxsize <= 0:
+            return
+        try:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        except KeyError:
+            pass # Another thread evicted the entry or emptied the cache meanwhile
+
+    ##
+    # @brief: Remove all entries and reset the counters
+    # @param self: Instance of the ExpressionCache class
+    #
+    def clear(self):
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    ##
+    # @brief: Report the cache counters
+    # @param self: Instance of the ExpressionCache class
+    # @return: Dictionary with hits, misses, evictions, current size and maxsize
+    #
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'size': len(self._entries),
+            'maxsize': self.maxsize,
+        }
+
+    def __len__(self):
+        return len(self._entries)
+
+
+# Cache of parsed expression programs shared by all custom_eval calls
+parse_cache = ExpressionCache(maxsize=256)
+
+
+# Largest integer power computed by the '^' operator, in bits; larger ones are rejected before computing them,
+# a single multiplication of huge integers would hold the interpreter lock for seconds
+POWER_MAX_BITS = 1 << 16
+
+
+##
+# @brief: Lower bound of the size of an integer power, computed without the power
+# @param left: Base
+# @param right: Exponent
+# @return: Number of bits the result has at least, 0 unless left is an int and right a positive integral number
+#
+# Only int bases are a concern: they are raised exactly, while float bases overflow to inf at once.
+#
+def power_result_bits(left, right):
+    if not isinstance(left, int) or right <= 0:
+        return 0
+    if not isinstance(right, int) and not (isinstance(right, float) and right.is_integer()):
+        return 0
+    return (abs(left).bit_length() - 1) * right
+
+##
+# @brief: Applies the '^' operator of the calculator
+# @param left: Base
+# @param right: Exponent
+# @return: left raised to right, negative bases keep the sign for odd exponents
+# @exception ValueError: If the exponent is negative or the result would exceed POWER_MAX_BITS
+#
+def power_operator(left, right):
+    # Handle cases with negative exponents
+    if right < 0 and left > 0:
+        raise ValueError("Neg. exp. not allowed")
+    if right < 0:
+        raise ValueError("Neg. exp. not allowed")
+    # Integer bases, e.g. the int result of 99^99, would be raised exactly to any size
+    if power_result_bits(left, right) > POWER_MAX_BITS:
+        raise ValueError("Result is too large.")
+    if left < 0 and int(right) % 2 != 0:
+        return -power(-left, right)
+    return power(left, right)
+
+
+##
+# @brief: Applies an operator to the given operands
+# @param operator: The operator to apply
+# @param values: List of values (operands), the result is pushed back onto it
+# @exception ValueError: If the operation is unsupported
+#
+def apply_operator(operator, values):
+    if operator == 'u-':
+        right = values.pop() # Remove the last value from the list
+        result = -right # Negate the value
+        values.append(result) # Add the negated value back to the list
+    else:
+        right = values.pop() # Remove the last value as the right operand
+        left = values.pop() # Remove the second-last value as the left operand
+        if operator == '^':
+            result = power_operator(left, right)
+        # Apply the operator to the operands and store the result
+        else:
+            result = operations[operator](left, right)
+
+        # If the result is an integer, store it as an int instead of float
+        if isinstance(result, float) and result.is_integer():
+            result = int(result)
+        values.append(result) # Add the result back to the list
+
+
+##
+# @brief: Compares the precedence of two operators
+# @param op1: First operator
+# @param op2: Second operator
+# @return: Boolean value indicating if op1 has greater or equal precedence than op2
+#
+def greater_precedence(op1, op2):
+    return precedences[op1] >= precedences[op2]
+
+
+##
+# @brief: Builds the transition table of the expression validator
+# @return: Tuple (transitions, start state, accepting states) of a deterministic automaton
+#
+# The automaton accepts the same language as the former validation regex
+#   ^\s*[-+()]?(\d+(\.\d+)?|\.\d+|\()+\s*([-+*/^()×÷]+\s*[-+()]?\s*(\d+(\.\d+)?|\.\d+|\()+\s*)*\)?$
+# but never backtracks, so validating an expression takes O(n) time.
+# Character classes: 'D' digit, 'W' whitespace, 'O' one of * / ^ × ÷, other symbols stand for themselves.
+#
+def _build_validator():
+    prefix = ('+', '-', '(', ')')
+    operators = ('+', '-', '(', ')', 'O')
+    # NFA: state -> list of (character class, next state); None is an epsilon move
+    nfa = {
+        0: [('W', 0), (None, 1)],                               # leading whitespace
+        1: [(c, 2) for c in prefix] + [(None, 2)],              # optional sign or parenthesis
+        2: [('D', 4), ('.', 3), ('(', 4)],                      # at least one number or '('
+        3: [('D', 4)],                                          # a '.' must be followed by a digit
+        4: [('D', 4), ('.', 3), ('(', 4), (None, 5)],           # more numbers or '('
+        5: [('W', 5), (None, 6), (None, 9)],                    # whitespace after the operand
+        6: [(c, 7) for c in operators],                         # one or more operators
+        7: [(c, 7) for c in operators] + [('W', 8), (None, 8)],
+        8: [('W', 8)] + [(c, 10) for c in prefix] + [(None, 10)],  # optional sign or parenthesis
+        10: [('W', 10), (None, 2)],                             # next operand
+        9: [(')', 11), (None, 11)],                             # optional closing parenthesis
+        11: [],                                                 # accept
+    }
+    classes = ('D', 'W', 'O', '.', '+', '-', '(', ')')
+
+    def closure(states):
+        stack = list(states)
+        result = set(states)
+        while stack:
+            for char_class, target in nfa[stack.pop()]:
+                if char_class is None and target not in result:
+                    result.add(target)
+                    stack.append(target)
+        return frozenset(result)
+
+    # Subset construction
+    start = closure({0})
+    transitions = {}
+    todo = [start]
+    while todo:
+        state = todo.pop()
+        if state in transitions:
+            continue
+        transitions[state] = {}
+        for char_class in classes:
+            targets = {target for source in state for c, target in nfa[source] if c == char_class}
+            if targets:
+                target = closure(targets)
+                transitions[state][char_class] = target
+                todo.append(target)
+
+    # Number the states so that the scanner works with small integers
+    numbers = {state: i for i, state in enumerate(transitions)}
+    table = [None] * len(numbers)
+    for state, moves in transitions.items():
+        table[numbers[state]] = {c: numbers[target] for c, target in moves.items()}
+    accepting = frozenset(numbers[state] for state in transitions if 11 in state)
+    return table, numbers[start], accepting
+
+
+_TRANSITIONS, _START, _ACCEPTING = _build_validator()
+
+# Character classes of the ASCII characters, other characters are classified by _char_class
+_CHAR_CLASSES = {c: 'D' for c in '0123456789'}
+_CHAR_CLASSES.update({c: 'W' for c in ' \t\n\r\f\v'})
+_CHAR_CLASSES.update({c: 'O' for c in '*/^×÷'})
+_CHAR_CLASSES.update({c: c for c in '.+-()'})
+
+##
+# @brief: Classifies a character for the validator
+# @param c: Character
+# @return: Character class, 'X' for characters that can not appear in a valid expression
+#
+def _char_class(c):
+    char_class = _CHAR_CLASSES.get(c)
+    if char_class is not None:
+        return char_class
+    if c.isdecimal():
+        return 'D'
+    if c.isspace():
+        return 'W'
+    return 'X'
+
+
+# State of the scanner before the first character: (validator state, error position, positions of the
+# unmatched opening parentheses, start of the number being read, whether that number already contains a '.',
+# whether a digit followed only by whitespace precedes the current character)
+_SCAN_START = (_START, None, (), None, False, False)
+
+
+##
+# @brief: Runs the validator and the tokenizer over a range of characters
+# @param expression: String containing the mathematical expression
+# @param start: Index of the first character to scan
+# @param end: Index after the last character to scan
+# @param scan_state: State of the scanner before the character at start, _SCAN_START for the beginning
+# @param tokens: List receiving the completed tokens
+# @param snapshots: Optional list receiving the state of the scanner and the number of tokens before every character
+# @return: State of the scanner after the character at end - 1
+# @exception ExpressionSyntaxError: If a single-operand operation follows a number
+#
+def _scan(expression, start, end, scan_state, tokens, snapshots=None):
+    state, error, opened, number_start, fraction, after_digit = scan_state
+    opened = list(opened)
+
+    for i in range(start, end):
+        if snapshots is not None:
+            snapshots.append((state, error, tuple(opened), number_start, fraction, after_digit, len(tokens)))
+        c = expression[i]
+        # A single-operand operation must not follow a number
+        if after_digit and c in 'l√x' and expression.startswith(('ln', '√x', 'x!'), i):
+            raise ExpressionSyntaxError("Invalid input format.", i)
+
+        char_class = _char_class(c)
+        if char_class == 'D':
+            after_digit = True
+        elif char_class != 'W':
+            after_digit = False
+
+        if state is None:
+            continue
+        state = _TRANSITIONS[state].get(char_class)
+        if state is None:
+            # Keep scanning for misplaced single-operand operations only
+            error = i
+            continue
+
+        # Parentheses must be balanced
+        if c == '(':
+            opened.append(i)
+        elif c == ')':
+            if not opened:
+                state = None
+                error = i
+                continue
+            opened.pop()
+
+        # Split the operands, the validator guarantees that every '.' is followed by a digit
+        if char_class == 'D':
+            if number_start is None:
+                number_start = i
+                fraction = False
+        elif c == '.':
+            if number_start is not None and not fraction:
+                fraction = True
+            else:
+                if number_start is not None:
+                    tokens.append(expression[number_start:i])
+                number_start = i
+                fraction = True
+        else:
+            if number_start is not None:
+                tokens.append(expression[number_start:i])
+                number_start = None
+            # Whitespace, '*' and '/' do not produce tokens; a leading '+' is dropped
+            if c in '-+×÷^()' and not (c == '+' and i == 0):
+                tokens.append(c)
+
+    return state, error, tuple(opened), number_start, fraction, after_digit
+
+##
+# @brief: Checks the state of the scanner at the end of the expression
+# @param expression: String containing the mathematical expression
+# @param end: Index after the last scanned character
+# @param scan_state: State returned by _scan
+# @param tokens: Tokens completed by _scan, not modified
+# @return: Tuple (tokens, error position) as returned by tokenize
+#
+def _finish_scan(expression, end, scan_state, tokens):
+    state, error, opened, number_start = scan_state[:4]
+    if state is None:
+        return None, error
+    if state not in _ACCEPTING:
+        return None, len(expression)
+    if opened:
+        return None, opened[-1]
+    if number_start is not None:
+        return tokens + [expression[number_start:end]], None
+    return tokens, None
+
+##
+# @brief: Validates and tokenizes an expression in a single left-to-right pass
+# @param expression: String containing the mathematical expression
+# @return: Tuple (tokens, error position); tokens is None and error position is the index
+#          of the first offending character (or the length of the expression) if the expression is invalid
+# @exception ExpressionSyntaxError: If a single-operand operation follows a number
+#
+def tokenize(expression):
+    # Like '$' in a regex, a single trailing newline is ignored
+    end = len(expression) - 1 if expression.endswith('\n') else len(expression)
+    tokens = []
+    return _finish_scan(expression, end, _scan(expression, 0, end, _SCAN_START, tokens), tokens)
+
+
+##
+# @brief: Parses a single-operand call the validator rejected, e.g. "ln(5)"
+# @param expression: String containing the mathematical expression
+# @param error: Error position reported by tokenize
+# @param number: Conversion of the operand, float or _exact_number
+# @return: Program [operand, operation]
+# @exception ExpressionSyntaxError: If the expression is not a single-operand call on a literal
+#
+def _single_operand_program(expression, error, number):
+    for operator in single_operand_operations:
+        if operator + '(' in expression:
+            start = expression.index(operator + '(') + len(operator + '(')
+            if ')' in expression and expression.index(')') > expression.index(operator + '('):
+                content = expression[start: expression.index(')')]
+                if re.match(r'-?\d+\.?\d*', content):
+                    return [number(content), operator] # Single-operand call on a literal
+                else:
+                    raise ExpressionSyntaxError("Invalid input format.", start)
+            else:
+                raise ExpressionSyntaxError("Invalid input format.", len(expression))
+    raise ExpressionSyntaxError("Incorrect input", error)
+
+##
+# @brief: Emits the RPN instructions of a range of tokens with the shunting-yard algorithm
+# @param tokens: List of tokens returned by tokenize
+# @param start: Index of the first token to process
+# @param program: List receiving the emitted instructions
+# @param operators: Stack of pending operators, updated in place
+# @param depth: Number of values the program leaves on the stack before the token at start
+# @param previous_token: Token processed before the token at start, None at the beginning
+# @param number: Conversion of the operand tokens, float or _exact_number
+# @param snapshots: Optional list receiving (program length, operators, depth, previous token) before every token
+# @return: Tuple (depth, previous token) after the last token
+#
+def _shunting_yard(tokens, start, program, operators, depth, previous_token, number, snapshots=None):
+    for index in range(start, len(tokens)):
+        if snapshots is not None:
+            snapshots.append((len(program), tuple(operators), depth, previous_token))
+        token = tokens[index]
+
+        # Handle unary minus (negative sign) and binary minus (subtraction)
+        if token == '-' and (not depth or (operators and operators[-1] in '+-×÷^(') or (previous_token and previous_token in '+-×÷^(')):
+            token = 'u-' # Replace '-' with 'u-' for unary minus
+            operators.append(token) # Add the unary minus to the operators list
+
+        elif token == '-' and (depth and operators and operators[-1] not in '+-×÷^('):
+            operators.append(token) # Add the binary minus to the operators list
+
+        # Handle numbers (operands)
+        elif token.replace('.', '', 1).replace('-', '', 1).isdigit():
+            value = number(token)
+            if operators and operators[-1] == 'u-':
+                value = -value
+                operators.pop()
+            program.append(value)
+            depth += 1
+
+        # Handle opening parentheses
+        elif token == '(':
+            operators.append(token) # Add the opening parenthesis to the operators list
+
+        # Handle closing parentheses
+        elif token == ')':
+            # Emit operators within parentheses until the opening parenthesis is reached
+            while operators and operators[-1] != '(':
+                operator = operators.pop()
+                program.append(operator)
+                if operator != 'u-':
+                    depth -= 1
+            operators.pop() # Remove the opening parenthesis from the operators list
+
+        # Handle binary operators (+, -, ×, ÷, ^)
+        else:
+            # Emit operators in the operators list with greater or equal precedence than the current operator
+            while (operators and operators[-1] != '(' and
+                    greater_precedence(operators[-1], token) and token != 'u-'):
+                operator = operators.pop()
+                program.append(operator)
+                if operator != 'u-':
+                    depth -= 1
+            operators.append(token) # Add the current operator to the operators list
+
+        previous_token = token # Update the previous token
+
+    return depth, previous_token
+
+##
+# @brief: Parses a mathematical expression into a reusable RPN program
+# @param expression: String containing the mathematical expression
+# @param exact: Push operands without a decimal point as ints instead of floats
+# @return: List of instructions; numbers are pushed as operands, strings are operators applied in order
+# @exception ExpressionSyntaxError: If the input format is invalid or unsupported, a subclass of ValueError
+#
+def parse_expression(expression, exact=False):
+    number = _exact_number if exact else float # Conversion of the operand tokens
+
+    # Validate and tokenize the expression into operands, operators, and parentheses
+    tokens, error = tokenize(expression)
+    if tokens is None:
+        return _single_operand_program(expression, error, number)
+
+    program = [] # Initialize a list to store the emitted instructions
+    operators = [] # Initialize a list to store the operators
+    _shunting_yard(tokens, 0, program, operators, 0, None, number)
+
+    # Emit the remaining operators
+    while operators:
+        program.append(operators.pop())
+
+    return program
+
+
+##
+# @brief: Parser for an expression that is edited a character at a time, e.g. in the calculator display
+#
+# The parser keeps the state of the scanner before every character and the state of the shunting-yard
+# algorithm before every token of the last parsed expression. Parsing the next version of the expression
+# restores the states at the end of the unchanged prefix and only processes the characters after it.
+#
+class IncrementalParser:
+    ##
+    # @brief: Constructor of the IncrementalParser class
+    # @param self: Instance of the IncrementalParser class
+    #
+    def __init__(self):
+        self.text = "" # Last parsed expression
+        self.reused = 0 # Number of characters of the last parsed expression taken over from the previous one
+        self._tokens = [] # Tokens completed by the scanner
+        self._scan_state = _SCAN_START # State of the scanner after the scanned characters
+        self._scan_snapshots = [] # State of the scanner before every scanned character
+        self._parsed_tokens = [] # Tokens processed by the shunting-yard algorithm
+        self._program = [] # Instructions emitted for _parsed_tokens
+        self._operators = [] # Pending operators after _parsed_tokens
+        self._parse_state = (0, None) # Depth and previous token after _parsed_tokens
+        self._parse_snapshots = [] # State of the shunting-yard algorithm before every processed token
+
+    ##
+    # @brief: Restores the scanner before a character of the last parsed expression
+    # @param self: Instance of the IncrementalParser class
+    # @param position: Index of the character, nothing is restored past the scanned characters
+    #
+    def _restore_scan(self, position):
+        if position < len(self._scan_snapshots):
+            snapshot = self._scan_snapshots[position]
+            self._scan_state = snapshot[:6]
+            del self._tokens[snapshot[6]:]
+            del self._scan_snapshots[position:]
+
+    ##
+    # @brief: Parses the expression, reusing the work done for the common prefix with the last one
+    # @param self: Instance of the IncrementalParser class
+    # @param expression: String containing the mathematical expression
+    # @return: List of instructions, as returned by parse_expression
+    # @exception ExpressionSyntaxError: If the input format is invalid or unsupported
+    #
+    def parse(self, expression):
+        end = len(expression) - 1 if expression.endswith('\n') else len(expression)
+
+        # Restore the scanner before the first changed character
+        reused = 0
+        limit = min(len(self._scan_snapshots), end)
+        while reused < limit and self.text[reused] == expression[reused]:
+            reused += 1
+        # The check for misplaced single-operand operations looks one character ahead
+        reused = max(reused - 1, 0)
+        self._restore_scan(reused)
+        self.text = expression
+        self.reused = reused
+        try:
+            self._scan_state = _scan(expression, reused, end, self._scan_state, self._tokens, self._scan_snapshots)
+        except ExpressionSyntaxError:
+            self._restore_scan(reused) # Drop the partial scan, the prefix stays reusable
+            raise
+
+        tokens, error = _finish_scan(expression, end, self._scan_state, self._tokens)
+        if tokens is None:
+            return _single_operand_program(expression, error, float)
+
+        # Restore the shunting-yard algorithm before the first changed token
+        common = 0
+        limit = min(len(self._parse_snapshots), len(tokens))
+        while common < limit and self._parsed_tokens[common] == tokens[common]:
+            common += 1
+        if common < len(self._parse_snapshots):
+            program_length, operators, depth, previous_token = self._parse_snapshots[common]
+            del self._program[program_length:]
+            self._operators = list(operators)
+            self._parse_state = (depth, previous_token)
+            del self._parse_snapshots[common:]
+        self._parsed_tokens = list(tokens)
+        self._parse_state = _shunting_yard(tokens, common, self._program, self._operators, *self._parse_state,
+                                           float, self._parse_snapshots)
+
+        # The remaining operators are emitted into a copy, the next call may continue the program
+        return self._program + self._operators[::-1]
+
+    ##
+    # @brief: Evaluates the expression, reusing the work done for the common prefix with the last one
+    # @param self: Instance of the IncrementalParser class
+    # @param expression: String containing the mathematical expression
+    # @return: The result of the evaluated expression, as custom_eval returns it
+    # @exception ValueError: If the input format is invalid or unsupported or the evaluation fails
+    #
+    def evaluate(self, expression):
+        return evaluate_program(self.parse(expression))
+
+
+##
+# @brief: Evaluates a program produced by parse_expression
+# @param program: List of instructions returned by parse_expression
+# @return: The result of the evaluated program
+# @exception ValueError: If the result is too large or an operation is not allowed
+#
+def evaluate_program(program):
+    values = [] # Initialize a list to store the values (operands)
+    for instruction in program:
+        if not isinstance(instruction, str):
+            values.append(instruction)
+        elif instruction in single_operand_operations:
+            return single_operand_operations[instruction](values.pop())
+        else:
+            apply_operator(instruction, values)
+
+    result = values[0] # Get the final result
+
+    # Check if the result is too large
+    if abs(result) > 1e300:
+        raise ValueError("Result is too large.")
+
+    # Return the final result
+    return result
+
+
+# Largest exact integer result, in bits; 2^13287 < 10^4000 keeps results printable with str()
+EXACT_MAX_BITS = 13287
+
+
+##
+# @brief: Converts an operand token in the exact-integer mode
+# @param token: Text of the operand
+# @return: int for tokens without a decimal point, float otherwise
+#
+def _exact_number(token):
+    if '.' in token:
+        return float(token)
+    return int(token)
+
+##
+# @brief: Division of the exact-integer mode
+# @param left: Dividend
+# @param right: Divisor
+# @return: Exact int quotient if right divides left, otherwise the float quotient
+# @exception ZeroDivisionError: If the divisor is zero
+#
+def exact_div(left, right):
+    if right == 0:
+        raise ZeroDivisionError("Cannot divide by 0.")
+    if isinstance(left, int) and isinstance(right, int) and left % right == 0:
+        return left // right
+    return left / right
+
+##
+# @brief: '^' operator of the exact-integer mode
+# @param left: Base
+# @param right: Exponent
+# @return: Exact int power for int operands, otherwise as power_operator
+# @exception ValueError: If the exponent is negative or the exact result would exceed EXACT_MAX_BITS
+#
+def exact_power(left, right):
+    # Reject results that are too large before computing them, also for integral float exponents
+    if power_result_bits(left, right) > EXACT_MAX_BITS:
+        raise ValueError("Result is too large.")
+    return power_operator(left, right)
+
+##
+# @brief: Factorial of the exact-integer mode
+# @param n: Non-negative integer
+# @return: Exact factorial of n
+# @exception ValueError: If the exact result would exceed EXACT_MAX_BITS
+#
+def exact_factorial(n):
+    if n > 1 and math.lgamma(n + 1) / math.log(2) > EXACT_MAX_BITS:
+        raise ValueError("Result is too large.")
+    return factorial(n)
+
+# Binary operators of the exact-integer mode, int operands stay ints except for inexact division
+exact_operations = {
+    '+': add,
+    '-': sub,
+    '×': mul,
+    '÷': exact_div,
+    '^': exact_power,
+}
+
+# Single-operand operations of the exact-integer mode
+exact_single_operand_operations = dict(single_operand_operations, **{'x!': exact_factorial})
+
+
+##
+# @brief: Checks the result of the exact-integer mode
+# @param result: Result of the program
+# @return: The result, integral floats are returned as ints
+# @exception ValueError: If the result is too large
+#
+def _finish_exact(result):
+    if isinstance(result, int):
+        if result.bit_length() > EXACT_MAX_BITS:
+            raise ValueError("Result is too large.")
+        return result
+    if abs(result) > 1e300:
+        raise ValueError("Result is too large.")
+    if result.is_integer():
+        return int(result)
+    return result
+
+##
+# @brief: Evaluates a program produced by parse_expression with exact=True
+# @param program: List of instructions returned by parse_expression
+# @return: The result of the evaluated program
+# @exception ValueError: If the result is too large or an operation is not allowed
+#
+# Int operands stay Python ints through '+', '-', '×', '^' and divisions without a remainder,
+# so large integer results are exact up to EXACT_MAX_BITS instead of being limited to 1e300.
+# Other values are promoted to float, and the result is converted back to int only once at the end.
+#
+def evaluate_exact_program(program):
+    values = [] # Initialize a list to store the values (operands)
+    try:
+        for instruction in program:
+            if not isinstance(instruction, str):
+                values.append(instruction)
+            elif instruction == 'u-':
+                values.append(-values.pop())
+            elif instruction in exact_single_operand_operations:
+                return _finish_exact(exact_single_operand_operations[instruction](values.pop()))
+            else:
+                right = values.pop()
+                values.append(exact_operations[instruction](values.pop(), right))
+    except OverflowError:
+        # Mixing an int beyond the float range with a float
+        raise ValueError("Result is too large.") from None
+    return _finish_exact(values[0])
+
+
+##
+# @brief: Custom evaluation function for mathematical expressions
+# @param expression: String containing the mathematical expression
+# @param exact: Evaluate in the exact-integer mode, see evaluate_exact_program
+# @return: The result of the evaluated expression
+# @exception ValueError: If the input format is invalid or unsupported
+#
+def custom_eval(expression, exact=False):
+    if exact:
+        key = (expression, True) # Exact programs are cached apart from the float ones
+        program = parse_cache.get(key)
+        if program is None:
+            program = parse_expression(expression, exact=True)
+            parse_cache.put(key, program)
+        return evaluate_exact_program(program)
+
+    # Reuse the parsed program if the same expression was evaluated before
+    program = parse_cache.get(expression)
+    if program is None:
+        program = parse_expression(expression)
+        parse_cache.put(expression, program)
+    return evaluate_program(program)
+
+
+# Functions callable in compiled expressions, written as in the calculator display
+compiled_functions = {
+    'ln': '_ln',
+    '√x': '_sqrt',
+    'x!': '_factorial',
+}
+
+# Binary operators of compiled expressions: (precedence, Python operator); '*' and '/' are accepted as well
+compiled_operators = {
+    '+': (1, '+'),
+    '-': (1, '-'),
+    '×': (2, '*'),
+    '*': (2, '*'),
+    '÷': (2, '/'),
+    '/': (2, '/'),
+    '^': (3, None),
+}
+
+
+##
+# @brief: Splits an expression with variables into tokens
+# @param expression: String containing the mathematical expression
+# @return: List of (kind, text, position) tuples; kind is 'number', 'variable', 'function' or 'symbol'
+# @exception ExpressionSyntaxError: If the expression contains an unexpected character
+#
+def tokenize_variables(expression):
+    tokens = []
+    i = 0
+    n = len(expression)
+    while i < n:
+        c = expression[i]
+        if c.isspace():
+            i += 1
+        elif c.isdecimal() or (c == '.' and i + 1 < n and expression[i + 1].isdecimal()):
+            start = i
+            while i < n and expression[i].isdecimal():
+                i += 1
+            if i + 1 < n and expression[i] == '.' and expression[i + 1].isdecimal():
+                i += 1
+                while i < n and expression[i].isdecimal():
+                    i += 1
+            tokens.append(('number', expression[start:i], start))
+        elif expression.startswith('√x', i):
+            tokens.append(('function', '√x', i))
+            i += 2
+        elif expression.startswith('x!', i):
+            tokens.append(('function', 'x!', i))
+            i += 2
+        elif c.isalpha():
+            start = i
+            while i < n and (expression[i].isalnum() or expression[i] == '_'):
+                i += 1
+            name = expression[start:i]
+            # Variables become parameters of the generated Python function
+            if keyword.iskeyword(name) or not name.isidentifier():
+                raise ExpressionSyntaxError("Incorrect input", start)
+            kind = 'function' if name in compiled_functions else 'variable'
+            tokens.append((kind, name, start))
+        elif c in compiled_operators or c in '()':
+            tokens.append(('symbol', c, i))
+            i += 1
+        else:
+            raise ExpressionSyntaxError("Incorrect input", i)
+    return tokens
+
+
+##
+# @brief: Parses an expression with variables into a tree (precedence climbing)
+# @param expression: String containing the mathematical expression
+# @return: Tree of tuples ('number', value), ('variable', name), ('negate', node),
+#          ('binary', operator, left, right) and ('call', function, node)
+# @exception ExpressionSyntaxError: If the input format is invalid
+#
+# Operators have the precedences of custom_eval: unary minus binds tighter than '^',
+# '^' binds tighter than '×' and '÷', which bind tighter than '+' and '-'; all binary operators are left-associative.
+#
+def parse_variables(expression):
+    tokens = tokenize_variables(expression)
+    position = 0
+
+    ##
+    # @brief: Returns the current token without consuming it
+    # @return: (kind, text, position) tuple or None at the end of the input
+    #
+    def peek():
+        return tokens[position] if position < len(tokens) else None
+
+    ##
+    # @brief: Consumes the current token if it is the given symbol
+    # @param symbol: Expected symbol
+    # @exception ExpressionSyntaxError: If the current token is a different one
+    #
+    def expect(symbol):
+        nonlocal position
+        token = peek()
+        if token is None or token[0] != 'symbol' or token[1] != symbol:
+            raise ExpressionSyntaxError("Incorrect input", token[2] if token else len(expression))
+        position += 1
+
+    ##
+    # @brief: Parses a number, variable, parenthesized expression, function call or signed operand
+    # @return: Tree of the operand
+    #
+    def parse_operand():
+        nonlocal position
+        token = peek()
+        if token is None:
+            raise ExpressionSyntaxError("Incorrect input", len(expression))
+        kind, text, start = token
+        position += 1
+        if kind == 'number':
+            return ('number', float(text))
+        if kind == 'variable':
+            return ('variable', text)
+        if kind == 'function':
+            expect('(')
+            argument = parse_binary(1)
+            expect(')')
+            return ('call', text, argument)
+        if text == '(':
+            node = parse_binary(1)
+            expect(')')
+            return node
+        if text == '-':
+            return ('negate', parse_operand())
+        if text == '+':
+            return parse_operand()
+        raise ExpressionSyntaxError("Incorrect input", start)
+
+    ##
+    # @brief: Parses binary operators of at least the given precedence
+    # @param min_precedence: Lowest precedence consumed at this level
+    # @return: Tree of the parsed subexpression
+    #
+    def parse_binary(min_precedence):
+        nonlocal position
+        left = parse_operand()
+        while True:
+            token = peek()
+            if token is None or token[0] != 'symbol' or token[1] not in compiled_operators:
+                return left
+            precedence = compiled_operators[token[1]][0]
+            if precedence < min_precedence:
+                return left
+            position += 1
+            right = parse_binary(precedence + 1)
+            left = ('binary', token[1], left, right)
+
+    tree = parse_binary(1)
+    if position < len(tokens):
+        raise ExpressionSyntaxError("Incorrect input", tokens[position][2])
+    return tree
+
+
+##
+# @brief: Collects the variables of a tree in order of their first appearance
+# @param node: Tree returned by parse_variables
+# @param names: List receiving the variable names
+# @return: The list of variable names
+#
+def tree_variables(node, names=None):
+    if names is None:
+        names = []
+    if node[0] == 'variable':
+        if node[1] not in names:
+            names.append(node[1])
+    elif node[0] == 'negate':
+        tree_variables(node[1], names)
+    elif node[0] == 'binary':
+        tree_variables(node[2], names)
+        tree_variables(node[3], names)
+    elif node[0] == 'call':
+        tree_variables(node[2], names)
+    return names
+
+
+##
+# @brief: Writes a power with a small positive integer exponent as a chain of multiplications
+# @param base: Source code of the base, a variable name
+# @param exponent: Positive integer exponent
+# @return: Source code multiplying in the same order as exponentiation by squaring in power()
+#
+def _power_source(base, exponent):
+    result = None
+    while exponent:
+        if exponent & 1:
+            result = base if result is None else '(%s * %s)' % (result, base)
+        exponent >>= 1
+        if exponent:
+            base = '(%s * %s)' % (base, base)
+    return result
+
+
+##
+# @brief: Translates a tree into a Python expression
+# @param node: Tree returned by parse_variables
+# @return: Source code of the Python expression
+#
+def tree_to_source(node):
+    kind = node[0]
+    if kind == 'number':
+        return repr(node[1])
+    if kind == 'variable':
+        return node[1]
+    if kind == 'negate':
+        return '(-%s)' % tree_to_source(node[1])
+    if kind == 'call':
+        return '%s(%s)' % (compiled_functions[node[1]], tree_to_source(node[2]))
+    operator, left, right = node[1], tree_to_source(node[2]), tree_to_source(node[3])
+    if operator == '^':
+        exponent = node[3][1] if node[3][0] == 'number' else None
+        if node[2][0] == 'variable' and exponent is not None and exponent.is_integer() and 1 <= exponent <= 8:
+            # Small constant powers of a variable are inlined as the multiplications power() would do
+            return _power_source(left, int(exponent))
+        return '_power(%s, %s)' % (left, right)
+    return '(%s %s %s)' % (left, compiled_operators[operator][1], right)
+
+
+##
+# @brief: Checks and normalizes the result of a compiled expression like custom_eval does
+# @param result: Result of the generated function
+# @return: The result, as an int if it is integral
+# @exception ValueError: If the result is too large
+#
+def _finish(result):
+    if abs(result) > 1e300:
+        raise ValueError("Result is too large.")
+    if isinstance(result, float) and result.is_integer():
+        return int(result)
+    return result
+
+
+##
+# @brief: Factorial of an integral operand of a compiled expression
+# @param n: Non-negative integral number, literals of compiled expressions are floats
+# @return: Factorial of n
+# @exception ValueError: If n is negative or not integral
+#
+def _compiled_factorial(n):
+    if isinstance(n, float):
+        if not n.is_integer():
+            raise ValueError("Input must be an integer")
+        n = int(n)
+    return factorial(n)
+
+
+# Names visible to the generated functions
+_compiled_namespace = {
+    '_power': power_operator,
+    '_ln': ln,
+    '_sqrt': sqrt,
+    '_factorial': _compiled_factorial,
+    '_finish': _finish,
+}
+
+# Cache of compiled expressions shared by all compile_expression calls
+compile_cache = ExpressionCache(maxsize=256)
+
+
+##
+# @brief: Compiles an expression with named variables into a reusable Python function
+# @param expression: String containing the mathematical expression, e.g. "x^2 + 3×x - 1"
+# @return: Function taking the variables as positional or keyword arguments in order of their first
+#          appearance; its variables attribute lists them and its source attribute holds the generated code
+# @exception ExpressionSyntaxError: If the input format is invalid
+#
+# The expression is parsed once and translated into Python arithmetic, so calling the function
+# costs about as much as evaluating the same formula written in Python.
+#
+def compile_expression(expression):
+    function = compile_cache.get(expression)
+    if function is not None:
+        return function
+
+    tree = parse_variables(expression)
+    variables = tree_variables(tree)
+    source = (
+        "def compiled(%s):\n"
+        "    try:\n"
+        "        return _finish(%s)\n"
+        "    except ZeroDivisionError:\n"
+        "        raise ZeroDivisionError('Cannot divide by 0.') from None\n"
+    ) % (', '.join(variables), tree_to_source(tree))
+    namespace = dict(_compiled_namespace)
+    exec(compile(source, '<expression %r>' % expression, 'exec'), namespace)
+
+    function = namespace['compiled']
+    function.variables = tuple(variables)
+    function.source = source
+    compile_cache.put(expression, function)
+    return function
+
+
+# Backends of evaluate_array; "auto" prefers NumPy when it is installed
+ARRAY_BACKENDS = ("auto", "python", "numpy")
+
+# Number of rows evaluated at once by the pure-Python backend of evaluate_array
+ARRAY_CHUNK = 4096
+
+# Largest n whose factorial is a finite float
+_MAX_FLOAT_FACTORIAL = 170
+
+
+##
+# @brief: Imports NumPy on first use, so that importing the engine stays cheap for the GUI
+# @return: The numpy module, or None if it is not installed
+#
+def _import_numpy():
+    try:
+        import numpy
+    except ImportError:  # NumPy is optional, evaluate_array falls back to the pure-Python loop
+        return None
+    return numpy
+
+
+##
+# @brief: Evaluates a tree over float64 arrays with the semantics of compiled expressions
+# @param numpy: The numpy module
+# @param node: Tree returned by parse_variables
+# @param columns: Dictionary mapping variable names to float64 arrays or floats
+# @return: Array (or float for constant subtrees) of results
+# @exception ValueError, ZeroDivisionError: If the operation fails for any element
+#
+def _evaluate_tree_numpy(numpy, node, columns):
+    kind = node[0]
+    if kind == 'number':
+        return node[1]
+    if kind == 'variable':
+        return columns[node[1]]
+    if kind == 'negate':
+        return -_evaluate_tree_numpy(numpy, node[1], columns)
+
+    if kind == 'call':
+        operand = numpy.asarray(_evaluate_tree_numpy(numpy, node[2], columns), dtype=numpy.float64)
+        if node[1] == 'x!':
+            if numpy.any(operand < 0):
+                raise ValueError("Input must be > 0")
+            if not numpy.all(operand == numpy.floor(operand)):
+                raise ValueError("Input must be an integer")
+            if numpy.any(operand > _MAX_FLOAT_FACTORIAL):
+                raise ValueError("Result is too large.")
+            # Integral operands index a table of the finite float factorials
+            table = numpy.array([float(factorial(k)) for k in range(_MAX_FLOAT_FACTORIAL + 1)])
+            return table[operand.astype(numpy.int64)]
+        if node[1] == '√x':
+            if numpy.any(operand < 0):
+                raise ValueError("Input must be > 0")
+            return numpy.sqrt(operand)
+        if numpy.any(operand <= 0):
+            raise ValueError("Input must be > 0")
+        return numpy.log(operand)
+
+    operator = node[1]
+    left = _evaluate_tree_numpy(numpy, node[2], columns)
+    right = _evaluate_tree_numpy(numpy, node[3], columns)
+    if operator == '+':
+        return left + right
+    if operator == '-':
+        return left - right
+    if operator in ('×', '*'):
+        return left * right
+    if operator in ('÷', '/'):
+        if numpy.any(numpy.asarray(right) == 0):
+            raise ZeroDivisionError("Cannot divide by 0.")
+        return left / right
+
+    # '^' as in power_operator: negative exponents are rejected, odd integral exponents keep the sign of the base
+    left = numpy.asarray(left, dtype=numpy.float64)
+    right = numpy.asarray(right, dtype=numpy.float64)
+    if numpy.any(right < 0):
+        raise ValueError("Neg. exp. not allowed")
+    integral = right == numpy.floor(right)
+    if numpy.any((left < 0) & ~integral):
+        raise ValueError("Result is not a real number")
+    odd = integral & (numpy.fmod(right, 2) != 0)
+    magnitude = numpy.power(numpy.abs(left), right)
+    return numpy.where((left < 0) & odd, -magnitude, magnitude)
+
+
+##
+# @brief: Evaluates an expression over columns of values with NumPy array operations
+# @param numpy: The numpy module
+# @param tree: Tree returned by parse_variables
+# @param columns: Dictionary mapping variable names to sequences or numbers
+# @param length: Number of rows
+# @return: float64 array of results
+#
+def _evaluate_array_numpy(numpy, tree, columns, length):
+    arrays = {}
+    for name, values in columns.items():
+        arrays[name] = values if isinstance(values, (int, float)) else numpy.asarray(values, dtype=numpy.float64)
+    # Overflow and invalid operations produce inf and nan, which are reported by the checks below
+    with numpy.errstate(all='ignore'):
+        result = _evaluate_tree_numpy(numpy, tree, arrays)
+        result = numpy.broadcast_to(numpy.asarray(result, dtype=numpy.float64), (length,)).copy()
+        if numpy.any(numpy.abs(result) > 1e300):
+            raise ValueError("Result is too large.")
+    return result
+
+
+##
+# @brief: Evaluates an expression over columns of values with the compiled function, in chunks of rows
+# @param function: Function returned by compile_expression
+# @param columns: Dictionary mapping variable names to sequences or numbers
+# @param length: Number of rows
+# @param chunk_size: Number of rows evaluated at once
+# @return: array('d') of results
+#
+def _evaluate_array_python(function, columns, length, chunk_size):
+    result = array('d')
+    for start in range(0, length, chunk_size):
+        stop = min(start + chunk_size, length)
+        arguments = []
+        for name in function.variables:
+            values = columns[name]
+            if isinstance(values, (int, float)):
+                arguments.append(repeat(values, stop - start))
+            else:
+                arguments.append(values[start:stop])
+        try:
+            result.extend(map(function, *arguments) if arguments else repeat(function(), stop - start))
+        except TypeError:
+            # Negative bases with fractional exponents give complex numbers, which array('d') rejects
+            raise ValueError("Result is not a real number") from None
+    return result
+
+
+##
+# @brief: Evaluates an expression for every row of columns of input values
+# @param expression: String containing the mathematical expression, e.g. "x^2 + 3×x - 1"
+# @param columns: Dictionary mapping each variable to a sequence of values or to a number used for every row
+# @param backend: One of ARRAY_BACKENDS
+# @param chunk_size: Number of rows evaluated at once by the pure-Python backend
+# @return: numpy.ndarray of float64 with the NumPy backend, array('d') with the pure-Python backend
+# @exception ExpressionSyntaxError: If the input format is invalid
+# @exception ValueError: If a variable is missing, the columns differ in length or the evaluation fails for any row
+#
+# The operators are applied to whole columns at once with NumPy; without NumPy, the function
+# returned by compile_expression is mapped over the rows chunk by chunk.
+#
+def evaluate_array(expression, columns, backend="auto", chunk_size=ARRAY_CHUNK):
+    if backend not in ARRAY_BACKENDS:
+        raise ValueError("Unknown backend: " + backend)
+    function = compile_expression(expression)
+    missing = [name for name in function.variables if name not in columns]
+    if missing:
+        raise ValueError("Missing values for: " + ", ".join(missing))
+
+    lengths = {len(columns[name]) for name in function.variables if not isinstance(columns[name], (int, float))}
+    if len(lengths) > 1:
+        raise ValueError("Columns must have the same length")
+    length = lengths.pop() if lengths else 1
+
+    numpy = _import_numpy() if backend != "python" else None
+    if numpy is None:
+        if backend == "numpy":
+            raise ValueError("NumPy is not installed")
+        return _evaluate_array_python(function, columns, length, chunk_size)
+    used = {name: columns[name] for name in function.variables}
+    return _evaluate_array_numpy(numpy, parse_variables(expression), used, length)
@@ -5,13 +5,59 @@
 # @brief: Extended Math Library for IVS project 2.
 # @author X
 # @Created: 2023-03-25
-# @Last Modified: 2023-03-25
+# @Last Modified: 2026-10-17
 ##
 
+import math
+import operator
+
 
 # @brief: Extended math operations
 
 
+# Precomputed factorials 0! .. 20!, the largest ones that fit into 64 bits
+_FACTORIAL_TABLE = [1]
+for _i in range(1, 21):
+    _FACTORIAL_TABLE.append(_FACTORIAL_TABLE[-1] * _i)
+del _i
+
+##
+# @brief: Product of the odd integers in [start, stop) computed by binary splitting
+# @param start: First odd integer of the range
+# @param stop: Odd integer one past the end of the range
+# @return: Product of the odd integers in the range
+#
+def _odd_range_product(start, stop):
+    count = (stop - start) // 2
+    if count <= 8:
+        result = 1
+        for i in range(start, stop, 2):
+            result *= i
+        return result
+    # Split in the middle so that both halves are of similar size
+    middle = (start + count) | 1
+    return _odd_range_product(start, middle) * _odd_range_product(middle, stop)
+
+##
+# @brief: Odd part of n!, i.e. n! with all factors of two removed
+# @param n: Non-negative integer
+# @return: Odd part of n!
+#
+def _odd_factorial(n):
+    inner = 1
+    outer = 1
+    upper = 3
+    # Odd numbers in (n >> (i + 1), n >> i] appear in n! exactly i + 1 times
+    for i in range(n.bit_length() - 2, -1, -1):
+        v = n >> i
+        if v <= 2:
+            continue
+        lower = upper
+        upper = (v + 1) | 1
+        inner *= _odd_range_product(lower, upper)
+        outer *= inner
+    return outer
+
 ##
 # @brief: Factorial (n!)
 # @param n: First operand
@@ -21,9 +67,26 @@
 def factorial(n):
     if n < 0:
         raise ValueError("Input must be > 0")
+    n = operator.index(n) # Reject non-integral operands with TypeError like range() did
+    if n < len(_FACTORIAL_TABLE):
+        return _FACTORIAL_TABLE[n]
+    # n! = odd part * 2^(n - number of set bits of n)
+    return _odd_factorial(n) << (n - bin(n).count("1"))
+
+##
+# @brief: Power with a non-negative integer exponent by repeated squaring
+# @param base: First operand
+# @param exponent: Non-negative integer exponent
+# @return: Power of base by exponent, computed with O(log exponent) multiplications
+#
+def _power_by_squaring(base, exponent):
     result = 1
-    for i in range(1, n + 1):
-        result *= i
+    while exponent:
+        if exponent & 1:
+            result *= base
+        exponent >>= 1
+        if exponent:
+            base *= base
     return result
 
 ##
@@ -41,9 +104,8 @@ def power(base, exponent):
 
     if isinstance(exponent, float) and exponent == int(exponent):
         exponent = int(exponent)
-        result = 1
-        for i in range(abs(exponent)):
-            result *= base
+        # Integer bases stay exact integers, float results overflow to inf like plain multiplication
+        result = _power_by_squaring(base, abs(exponent))
         if exponent < 0:
             return 1 / result
         else:
@@ -51,6 +113,9 @@ def power(base, exponent):
     else:
         return base ** exponent
 
+# Newton's iteration for sqrt stops once the relative change is below this
+_SQRT_TOLERANCE = 1e-15
+
 ##
 # @brief: Sqrt
 # @param n: First operand
@@ -66,46 +131,78 @@ def sqrt(n):
     elif n < 0:
         raise ValueError("Input must be > 0")
     else:
-        guess = n
-        while True:
+        # Seed the guess from the exponent: n = m * 2^e with m in [0.5, 2) and e even,
+        # so sqrt(n) = sqrt(m) * 2^(e/2) and sqrt(m) is approximated by a line
+        m, e = math.frexp(n)
+        if e % 2:
+            m *= 2
+            e -= 1
+        guess = math.ldexp(0.4 + 0.6 * m, e // 2)
+        for i in range(64):
             new_guess = (guess + n / guess) / 2
-            if abs(new_guess - guess) < 1e-6:
+            if abs(new_guess - guess) <= _SQRT_TOLERANCE * new_guess:
                 return new_guess
             guess = new_guess
+        return guess
+
+##
+# @brief: Sqrt of every number of a sequence
+# @param values: Sequence of operands
+# @return: List of square roots in the order of values
+# @exception ValueError if any operand is negative.
+#
+def sqrt_batch(values):
+    return [sqrt(n) for n in values]
+
+##
+# @brief: Sum of the series atanh(z) = z + z^3/3 + z^5/5 + ...
+# @param z: Value with |z| < 1, the smaller the faster the series converges
+# @param num_terms: Maximal number of terms of the series
+# @param tolerance: Summation stops once a term is below tolerance relative to the sum
+# @return: atanh(z)
+#
+def _atanh_series(z, num_terms, tolerance):
+    z_squared = z * z
+    power = z
+    total = z
+    for n in range(1, num_terms):
+        power *= z_squared
+        term = power / (2 * n + 1)
+        total += term
+        if abs(term) <= tolerance * abs(total):
+            break
+    return total
+
+# ln(2) and sqrt(1/2) rounded to double precision, used by the range reduction
+_LN2 = 0.6931471805599453
+_SQRT_HALF = 0.7071067811865476
 
 ##
 # @brief: Compute the natural logarithm (ln) of x.
 # @param x: The input value.
-# @param num_terms: The number of terms to use in the Taylor series expansion.
+# @param num_terms: The maximal number of terms of the series expansion.
 #                      Defaults to 1000.
+# @param tolerance: Relative size of the last term at which the series is stopped;
+#                      larger values trade accuracy for speed. Defaults to 1e-16.
 # @return: The natural logarithm of x.
 #
-def ln(x, num_terms=1000):
+def ln(x, num_terms=1000, tolerance=1e-16):
     """
     Compute the natural logarithm (ln) of x.
     """
-    if x <= 0:
+    # NaN fails every comparison, so it is rejected explicitly instead of running through the reduction
+    if x <= 0 or x != x:
         raise ValueError("Input must be > 0")
     if x == 1:
         return 0.0
-    if x < 1:
-        return -ln(1 / x, num_terms=num_terms)
-
-    # Use the Taylor series expansion of ln(1+x) around x=0:
-    if x > 2:
-        y = x ** (1 / 2)
-        return ln(y, num_terms=num_terms) + ln(x / y, num_terms=num_terms)
-
-    # Compute the terms of the Taylor series expansion:
-    total = 0.0
-    power = x - 1
-    for n in range(1, num_terms + 1):
-        term = power / n
-        if n % 2 == 0:
-            term = -term
-        total += term
-        power *= (x - 1)
-    return total
-
+    if x == math.inf:
+        return math.inf
 
+    # Reduce x = m * 2^k with m in [sqrt(1/2), sqrt(2)), so that ln(x) = k * ln(2) + ln(m)
+    m, k = math.frexp(x)
+    if m < _SQRT_HALF:
+        m *= 2
+        k -= 1
 
+    # ln(m) = 2 * atanh((m - 1) / (m + 1)), where |(m - 1) / (m + 1)| < 0.18
+    return k * _LN2 + 2 * _atanh_series((m - 1) / (m + 1), num_terms, tolerance)
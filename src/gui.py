@@ -5,189 +5,359 @@
 # @brief: GUI for IVS project 2.
 # @author Michal Petrán
 # @Created: 22-03-2023
-# @Last Modified: 25-04-2023
+# @Last Modified: 17-10-2026
 ##
 
 
 # Import necessary libraries
+import math  # Provides the logarithm used to find the bucket of a latency
+import os  # Provides the clock tick rate used to find the process start time
 import sys  # Provides access to some variables and functions used or maintained by the interpreter
-import re  # Provides regular expression support for pattern matching in strings
+import time  # Provides the clock used to measure event loop stalls, input latency and the startup time
+from contextlib import contextmanager  # Provides the decorator of InputLatencyMonitor.measure
+
+STARTED = time.perf_counter() # Time gui.py started executing, before the PyQt5 imports; reported by --startup-profile
+
 from PyQt5.QtWidgets import QApplication, QMainWindow, QLineEdit, QPushButton, QVBoxLayout, QWidget, QGridLayout, QLabel, QHBoxLayout, QSizePolicy, QDialog, QScrollArea  # Import necessary PyQt5 widgets for building the GUI
 from PyQt5.QtGui import QFont  # Import QFont for setting font properties
-from PyQt5.QtCore import Qt  # Import QtCore for access to Qt's core non-GUI functionality
-from math_lib import add, sub, mul, div  # Import basic math functions from custom math_lib module
-from extended_math_lib import factorial, power, sqrt, ln  # Import extended math functions from custom extended_math_lib module
+from PyQt5.QtCore import Qt, QEvent, QTimer, QObject, QRunnable, QThreadPool, pyqtSignal  # Import QtCore for access to Qt's core non-GUI functionality, timers and worker threads
+from extended_math_lib import factorial, sqrt  # Import extended math functions from custom extended_math_lib module
+from calc_engine import custom_eval, evaluate_program, IncrementalParser  # Import the expression evaluator from the headless calc_engine module
+
+IMPORTED = time.perf_counter() # Time the imports of gui.py were done
+
+
+# Delay in milliseconds after the last change of the display before the live preview is evaluated
+PREVIEW_DELAY_MS = 150
+
+# Delay in milliseconds before a running evaluation shows the busy indicator
+BUSY_DELAY_MS = 100
+
+# Stylesheets of the display, with the frame for typed text and without it for long results and button input;
+# the font size is set with cached QFont objects, so that switching sizes does not re-parse any stylesheet
+DISPLAY_STYLE_FRAMED = """
+    QLineEdit {
+        background-color: #202020;
+        color: white;
+        border: 2px solid white;
+        padding: 0 10px;
+        text-align: right;
+    }
+"""
+DISPLAY_STYLE_FRAMELESS = """
+    QLineEdit {
+        background-color: #202020;
+        color: white;
+        border: none;
+        padding: 0 10px;
+    }
+"""
 
 
 ##
-# @brief: Checks if the parentheses in the given string are valid
-# @param s: String containing the expression
-# @return Boolean: value indicating whether the parentheses are valid or not
+# @brief: Signals of an EvaluationWorker, delivered to the GUI thread
+# @param QObject: Parent class
 #
-def is_valid_parentheses(s):
-    stack = [] # Initialize an empty stack
-    for c in s:
-        if c == '(': # If an opening parenthesis is found, add it to the stack
-            stack.append(c)
-        elif c == ')': # If a closing parenthesis is found
-            if not stack: # If the stack is empty, parentheses are not balanced
-                return False
-            stack.pop() # Remove the last opening parenthesis from the stack
-    return not stack # Return True if the stack is empty, otherwise False
- 
+class WorkerSignals(QObject):
+    finished = pyqtSignal(int, object) # Job id and the value returned by the function
+    failed = pyqtSignal(int, object) # Job id and the exception raised by the function
+
 
 ##
-# @brief: Custom evaluation function for mathematical expressions
-# @param expression: String containing the mathematical expression
-# @return: The result of the evaluated expression
-# @exception ValueError: If the input format is invalid or unsupported
+# @brief: Runs a computation on a thread of a QThreadPool
+# @param QRunnable: Parent class
 #
-def custom_eval(expression):
-    
+class EvaluationWorker(QRunnable):
     ##
-    # @brief: Applies an operator to the given operands
-    # @param operators: List of operators
-    # @param values: List of values (operands)
-    # @exception ValueError: If the operation is unsupported
+    # @brief: Constructor of the EvaluationWorker class
+    # @param self: Instance of the EvaluationWorker class
+    # @param job: Id of the job, passed back with the signals
+    # @param function: Function to call, it must not touch any widget
+    # @param args: Arguments of the call
     #
-    def apply_operator(operators, values):
-        operator = operators.pop() # Remove the last operator from the list
-        if operator == 'u-':
-            right = values.pop() # Remove the last value from the list
-            result = -right # Negate the value
-            values.append(result) # Add the negated value back to the list
+    def __init__(self, job, function, *args):
+        super().__init__()
+        self.job = job
+        self.function = function
+        self.args = args
+        self.signals = WorkerSignals() # Created in the GUI thread, so the signals are queued to it
+
+    ##
+    # @brief: Calls the function and emits its result or its exception
+    # @param self: Instance of the EvaluationWorker class
+    #
+    def run(self):
+        try:
+            result = self.function(*self.args)
+        except Exception as e:
+            self.signals.failed.emit(self.job, e)
         else:
-            right = values.pop() # Remove the last value as the right operand   
-            left = values.pop() # Remove the second-last value as the left operand
-            if operator == '^':
-                # Handle cases with negative exponents
-                if right < 0 and left > 0:
-                    raise ValueError("Neg. exp. not allowed")
-                if right < 0:
-                    raise ValueError("Neg. exp. not allowed")
-                if left < 0 and int(right) % 2 != 0:
-                    result = -power(-left, right)
-                else:
-                    result = power(left, right)
-            # Apply the operator to the operands and store the result
-            else:
-                result = operations[operator](left, right)
-                
-            # If the result is an integer, store it as an int instead of float
-            if isinstance(result, float) and result.is_integer():
-                result = int(result)
-            values.append(result) # Add the result back to the list
+            self.signals.finished.emit(self.job, result)
+
+
+##
+# @brief: Time since the process was started, read from /proc on Linux
+# @return: Age of the process in seconds with a resolution of one clock tick (usually 10 ms), None where unavailable
+#
+def process_age():
+    try:
+        with open("/proc/self/stat") as stat:
+            start_ticks = int(stat.read().rsplit(")", 1)[1].split()[19]) # Field 22, starttime, after the command name
+        with open("/proc/uptime") as uptime:
+            seconds_since_boot = float(uptime.read().split()[0])
+        return seconds_since_boot - start_ticks / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
 
+##
+# @brief: Reports the time to the first paint of a window, installed by --startup-profile
+# @param QObject: Parent class
+#
+class StartupProfiler(QObject):
     ##
-    # @brief: Compares the precedence of two operators
-    # @param op1: First operator
-    # @param op2: Second operator
-    # @return: Boolean value indicating if op1 has greater or equal precedence than op2
+    # @brief: Constructor of the StartupProfiler class, starts watching the window
+    # @param self: Instance of the StartupProfiler class
+    # @param window: The window whose first paint ends the startup
+    # @param constructed: perf_counter time when the window was constructed
     #
-    def greater_precedence(op1, op2):
-        precedences = {'+': 1, '-': 1, '×': 2, '÷': 2, '^': 3, 'u-': 4}
-        return precedences[op1] >= precedences[op2]
-
-
-    # Define the supported binary operations
-    operations = {
-        '+': add,
-        '-': sub,
-        '×': mul,
-        '÷': div,
-        '^': power,
-    }
+    def __init__(self, window, constructed):
+        super().__init__(window)
+        self.window = window
+        self.constructed = constructed
+        self.report = None # Report line, set at the first paint
+        window.installEventFilter(self)
 
-    # Define the supported single-operand operations
-    single_operand_operations = {
-        'x!': factorial,
-        '√x': sqrt,
-        'ln': ln
-    }
-    
-    # Check if there are any invalid single-operand operations
-    if re.search(r'\d+\s*(ln|√x|x!)', expression):
-        raise ValueError("Invalid input format.")
-
-    # Check if the input expression is valid
-    if not re.match(r'^\s*[\-+\(\)]?(\d+(\.\d+)?|\.\d+|\()+\s*([\+\-\*/\^\(\)×÷]+\s*[\-+\(\)]?\s*(\d+(\.\d+)?|\.\d+|\()+\s*)*\)?$', expression) or not is_valid_parentheses(expression):
-        for operator, func in single_operand_operations.items():
-            if operator + '(' in expression:
-                if ')' in expression and expression.index(')') > expression.index(operator + '('):
-                    content = expression[expression.index(operator + '(') + len(operator + '('): expression.index(')')]
-                    if re.match(r'-?\d+\.?\d*', content):
-                        a = float(content)
-                        return func(a)
-                    else:   
-                        raise ValueError("Invalid input format.")
-                else:
-                    raise ValueError("Invalid input format.")
-        raise ValueError("Incorrect input")
-    
-   
-    expression = expression.lstrip('+')  # Remove leading '+' sign if present
-    
-    expression = re.sub(r'\s+', '', expression) # Remove whitespaces from the expression
+    ##
+    # @brief: Prints the startup times at the first paint event of the window
+    # @param self: Instance of the StartupProfiler class
+    # @param watched: The window
+    # @param event: The event delivered to the window
+    # @return: False, the event is processed normally
+    #
+    def eventFilter(self, watched, event):
+        if event.type() == QEvent.Paint and self.report is None:
+            painted = time.perf_counter()
+            age = process_age()
+            self.report = "startup: first paint %s%.1f ms after gui.py started (imports %.1f ms, window %.1f ms)" % (
+                "%.0f ms after process start, " % (age * 1000) if age is not None else "",
+                (painted - STARTED) * 1000, (IMPORTED - STARTED) * 1000, (self.constructed - IMPORTED) * 1000)
+            print(self.report, file=sys.stderr)
+            self.window.removeEventFilter(self)
+        return False
 
-    # Tokenize the expression into operands, operators, and parentheses
-    tokens = re.findall(r'\d*\.\d+|\d+|[-+×÷^()]', expression.replace(' ', ''))
-    values = [] # Initialize a list to store the values (operands)
-    operators = [] # Initialize a list to store the operators
-    
-    previous_token = None # Keep track of the previous token
-
-    # Iterate through the tokens
-    for token in tokens:
-        # Handle unary minus (negative sign) and binary minus (subtraction)
-        if token == '-' and (not values or (operators and operators[-1] in '+-×÷^(') or (previous_token and previous_token in '+-×÷^(')):
-            token = 'u-' # Replace '-' with 'u-' for unary minus
-            operators.append(token) # Add the unary minus to the operators list
-            
-        elif token == '-' and (values and operators and operators[-1] not in '+-×÷^('):
-            operators.append(token) # Add the binary minus to the operators list
-            
-        # Handle numbers (operands)
-        elif token.replace('.', '', 1).replace('-', '', 1).isdigit():
-            value = float(token)
-            if operators and operators[-1] == 'u-':
-                value = -value
-                operators.pop()
-            values.append(value)
-        
-        # Handle opening parentheses
-        elif token == '(':
-            operators.append(token) # Add the opening parenthesis to the operators list
-        
-        # Handle closing parentheses
-        elif token == ')':
-            # Apply operators within parentheses until the opening parenthesis is reached
-            while operators and operators[-1] != '(':
-                apply_operator(operators, values) # Apply the operator to the operands
-            operators.pop() # Remove the opening parenthesis from the operators list
-            
-        # Handle binary operators (+, -, ×, ÷, ^)
+
+##
+# @brief: Measures how long the event loop is blocked, from the delays of a periodic timer
+# @param QObject: Parent class
+#
+class EventLoopMonitor(QObject):
+    ##
+    # @brief: Constructor of the EventLoopMonitor class
+    # @param self: Instance of the EventLoopMonitor class
+    # @param interval: Period of the timer in milliseconds
+    # @param threshold: Stalls longer than this many milliseconds are counted
+    # @param parent: Parent object, default is None
+    #
+    def __init__(self, interval=10, threshold=50, parent=None):
+        super().__init__(parent)
+        self.interval = interval
+        self.threshold = threshold
+        self.ticks = 0 # Number of timer events
+        self.stalls = 0 # Number of delays longer than threshold
+        self.max_stall = 0.0 # Longest delay of a timer event in milliseconds
+        self._last = None # Time of the last timer event
+        self._timer = QTimer(self)
+        self._timer.setInterval(interval)
+        self._timer.timeout.connect(self._tick)
+
+    ##
+    # @brief: Starts measuring
+    # @param self: Instance of the EventLoopMonitor class
+    #
+    def start(self):
+        self._last = time.perf_counter()
+        self._timer.start()
+
+    ##
+    # @brief: Records the delay of a timer event
+    # @param self: Instance of the EventLoopMonitor class
+    #
+    def _tick(self):
+        now = time.perf_counter()
+        stall = (now - self._last) * 1000 - self.interval # Time the event loop could not process the timer
+        self._last = now
+        self.ticks += 1
+        self.max_stall = max(self.max_stall, stall)
+        if stall > self.threshold:
+            self.stalls += 1
+
+    ##
+    # @brief: Summarizes the measurement
+    # @param self: Instance of the EventLoopMonitor class
+    # @return: One line report
+    #
+    def report(self):
+        return "event loop: %d ticks, max stall %.1f ms, %d stalls over %d ms" % (
+            self.ticks, self.max_stall, self.stalls, self.threshold)
+
+
+##
+# @brief: Histogram of latencies with logarithmic buckets, its memory does not grow with the number of samples
+#
+class LatencyHistogram:
+    MINIMUM = 1e-6 # Upper edge of the first bucket in seconds
+    RATIO = 1.1 # Ratio of the edges of neighbouring buckets, percentiles are accurate to 10 %
+    BUCKETS = 171 # The last bucket collects everything above about 10 s
+
+    ##
+    # @brief: Constructor of the LatencyHistogram class, creates an empty histogram
+    # @param self: Instance of the LatencyHistogram class
+    #
+    def __init__(self):
+        self.counts = [0] * self.BUCKETS # Bucket i counts latencies in (MINIMUM * RATIO^(i-1), MINIMUM * RATIO^i]
+        self.count = 0 # Number of samples
+        self.total = 0.0 # Sum of the samples in seconds
+        self.maximum = 0.0 # Largest sample in seconds
+
+    ##
+    # @brief: Adds a sample
+    # @param self: Instance of the LatencyHistogram class
+    # @param seconds: Latency in seconds
+    #
+    def add(self, seconds):
+        if seconds <= self.MINIMUM:
+            index = 0
         else:
-            # Apply operators in the operators list with greater or equal precedence than the current operator
-            while (operators and operators[-1] != '(' and
-                    greater_precedence(operators[-1], token) and token != 'u-'):
-                apply_operator(operators, values)
-            operators.append(token) # Add the current operator to the operators list
-            
-        previous_token = token # Update the previous token
+            index = min(math.ceil(math.log(seconds / self.MINIMUM, self.RATIO)), self.BUCKETS - 1)
+        self.counts[index] += 1
+        self.count += 1
+        self.total += seconds
+        self.maximum = max(self.maximum, seconds)
+
+    ##
+    # @brief: Estimates a percentile from the buckets
+    # @param self: Instance of the LatencyHistogram class
+    # @param percent: The percentile, e.g. 99
+    # @return: Upper edge of the bucket holding the percentile, at most the largest sample; the largest sample for the
+    #          last bucket, which has no upper edge; 0.0 without samples
+    #
+    def percentile(self, percent):
+        rank = math.ceil(self.count * percent / 100) or 1 # Number of samples at or below the percentile
+        cumulative = 0
+        for index, count in enumerate(self.counts):
+            cumulative += count
+            if cumulative >= rank:
+                if index == self.BUCKETS - 1:
+                    return self.maximum
+                return min(self.MINIMUM * self.RATIO ** index, self.maximum)
+        return 0.0
 
-    # Continue applying operators until the operators list is empty
-    while operators:
-        apply_operator(operators, values)
 
-    result = values[0] # Get the final result
-    
-    # Check if the result is too large
-    if abs(result) > 1e300:
-        raise ValueError("Result is too large.")
+##
+# @brief: Records the latency of key presses and button clicks, installed by --latency-report and --latency-overlay
+# @param QObject: Parent class
+#
+# Handling times are measured by Calculator.keyPressEvent and Calculator._buttonClicked, the time to the next paint of
+# the display by the event filter and the time of evaluations on the worker threads by Calculator._evaluation_finished.
+#
+class InputLatencyMonitor(QObject):
+    PERCENTILES = (50, 95, 99)
+    MAX_PAINT_DELAY = 1.0 # Inputs that were not followed by a paint within this many seconds changed nothing on screen
+
+    ##
+    # @brief: Constructor of the InputLatencyMonitor class, starts watching the paint events of the display
+    # @param self: Instance of the InputLatencyMonitor class
+    # @param display: The widget showing the input
+    # @param parent: Parent object, default is None
+    #
+    def __init__(self, display, parent=None):
+        super().__init__(parent)
+        self.histograms = {name: LatencyHistogram() for name in ("key", "button", "input to paint", "evaluation")}
+        self._depth = 0 # Number of measurements in progress, a key press triggering a button is measured once
+        self._input_started = None # Time of the last input not yet painted
+        self.display = display
+        display.installEventFilter(self)
+
+    ##
+    # @brief: Measures the handling of an input event
+    # @param self: Instance of the InputLatencyMonitor class
+    # @param name: Name of the histogram, "key" or "button"
+    #
+    @contextmanager
+    def measure(self, name):
+        if self._depth:
+            yield
+            return
+        start = time.perf_counter()
+        self._input_started = start
+        self._depth += 1
+        try:
+            yield
+        finally:
+            self._depth -= 1
+            self.record(name, time.perf_counter() - start)
+
+    ##
+    # @brief: Adds a sample to a histogram
+    # @param self: Instance of the InputLatencyMonitor class
+    # @param name: Name of the histogram
+    # @param seconds: Latency in seconds
+    #
+    def record(self, name, seconds):
+        self.histograms[name].add(seconds)
+
+    ##
+    # @brief: Records the time from the last input to the following paint of the display
+    # @param self: Instance of the InputLatencyMonitor class
+    # @param watched: The display
+    # @param event: The event delivered to the display
+    # @return: False, the event is processed normally
+    #
+    def eventFilter(self, watched, event):
+        if event.type() == QEvent.Paint and self._input_started is not None:
+            delay = time.perf_counter() - self._input_started
+            self._input_started = None
+            if delay <= self.MAX_PAINT_DELAY:
+                self.record("input to paint", delay)
+        return False
+
+    ##
+    # @brief: Summarizes the histograms
+    # @param self: Instance of the InputLatencyMonitor class
+    # @return: Table with the count, the percentiles and the maximum of every histogram in milliseconds
+    #
+    def report(self):
+        lines = ["%-15s %7s" % ("latency (ms)", "count") + "".join("%9s" % ("p%d" % p) for p in self.PERCENTILES)
+                 + "%9s" % "max"]
+        for name, histogram in self.histograms.items():
+            lines.append("%-15s %7d" % (name, histogram.count)
+                         + "".join("%9.3f" % (histogram.percentile(p) * 1000) for p in self.PERCENTILES)
+                         + "%9.3f" % (histogram.maximum * 1000))
+        return "\n".join(lines)
 
-    # Return the final result
-    return result
+    ##
+    # @brief: Short summary of the input latencies for the overlay
+    # @param self: Instance of the InputLatencyMonitor class
+    # @return: One line per input histogram with samples
+    #
+    def summary(self):
+        lines = []
+        for name in ("key", "button", "input to paint"):
+            histogram = self.histograms[name]
+            if histogram.count:
+                lines.append("%s " % name + " ".join("p%d %.2f" % (p, histogram.percentile(p) * 1000)
+                                                     for p in self.PERCENTILES) + " ms")
+        return "\n".join(lines)
 
+    ##
+    # @brief: Writes the report to a file
+    # @param self: Instance of the InputLatencyMonitor class
+    # @param path: Path of the file, overwritten
+    #
+    def write(self, path):
+        with open(path, "w", encoding="utf-8") as handle:
+            handle.write(self.report() + "\n")
 
 
 ##
@@ -441,7 +611,7 @@ class Calculator(QMainWindow):
         super().__init__() # Call the QMainWindow constructor
         self.setObjectName("CalculatorWidget")
 
-        self.setFixedSize(320, 480)  # Set a fixed size for the calculator window
+        self.setFixedSize(320, 500)  # Set a fixed size for the calculator window
         self.setWindowFlags(Qt.FramelessWindowHint | Qt.Window)  # Set window flags for a frameless window
 
 
@@ -457,6 +627,34 @@ class Calculator(QMainWindow):
         self.x_y_base = None  # Initialize a variable to store the x and y base values for certain operations
         self.display.textChanged.connect(self._adjust_font_size)  # Connect the textChanged signal to adjust the font size
 
+        # Evaluate the live preview once typing pauses, reusing the parse of the unchanged prefix of the display
+        self.preview_parser = IncrementalParser()
+        self.preview_timer = QTimer(self)
+        self.preview_timer.setSingleShot(True)
+        self.preview_timer.setInterval(PREVIEW_DELAY_MS)
+        self.preview_timer.timeout.connect(self._update_preview)
+        self.display.textChanged.connect(self._schedule_preview)  # Restarting the timer coalesces fast keystrokes
+        self._preview_job = 0 # Id of the latest preview evaluation, results of older ones are discarded
+        self._preview_workers = {} # Running preview workers by job id, kept referenced until they finish
+
+        # Evaluations run on worker threads so that the window stays responsive
+        self.thread_pool = QThreadPool(self)
+        self.thread_pool.setMaxThreadCount(4) # Cancelled evaluations keep their thread until they finish
+        self._job = 0 # Id of the latest evaluation, results of older ones are discarded
+        self._workers = {} # Running workers by job id, kept referenced until they finish
+        self._busy = False # Whether the latest evaluation is still running
+        self._busy_shown = False # Whether the busy indicator is shown
+        self.busy_timer = QTimer(self) # Shows the busy indicator only for evaluations that take noticeable time
+        self.busy_timer.setSingleShot(True)
+        self.busy_timer.setInterval(BUSY_DELAY_MS)
+        self.busy_timer.timeout.connect(self._show_busy)
+
+        self._tutorial_window = None # Tutorial window, built on first use by showTutorial and reused afterwards
+        self.latency = None # InputLatencyMonitor, created by enable_latency_monitor
+        self.result_cache = None # PersistentResultCache reused by _compute_expression, set by --result-cache
+        self._job_started = 0.0 # Time the latest evaluation was started
+        self.display.textChanged.connect(self._cancel_evaluation)  # Editing the display abandons the pending result
+
         self.show()  # Show the calculator window
 
     
@@ -563,6 +761,13 @@ class Calculator(QMainWindow):
         self.display.setReadOnly(True)
         self.display.setAlignment(Qt.AlignRight)
         self.generalLayout.addWidget(self.display)
+
+        # Create the live preview label showing the result of the expression being typed
+        self.preview = QLabel("")
+        self.preview.setFixedHeight(20)
+        self.preview.setAlignment(Qt.AlignRight | Qt.AlignVCenter)
+        self.preview.setStyleSheet("color: #A0A0A0; font-size: 14px; padding: 0 10px;")
+        self.generalLayout.addWidget(self.preview)
         
         
         # Set the style for the calculator
@@ -605,7 +810,6 @@ class Calculator(QMainWindow):
             QLineEdit {
                 background-color: #202020;
                 color: white;
-                font-size: 34px;
                 border: 2px solid white;
                 border-radius: 0;
                 padding: 0 10px;
@@ -636,6 +840,12 @@ class Calculator(QMainWindow):
         self.display.setMaxLength(21) # Set the maximum length of the display
         self.display.setContentsMargins(0, 0, 0, 0)
 
+        # Set up the cached display styles, only changes of the style are applied to the display
+        self._display_fonts = {} # QFont of the display by pixel size
+        self._display_style = None # (font size, framed) applied to the display
+        self._shrink_long_text = False # Whether the text being set shrinks when longer than 15 characters
+        self._set_display_style(30, True)
+
     ##
     # @brief: Create the buttons for the calculator and add them to the layout
     # @param self: Instance of the Calculator class
@@ -764,64 +974,34 @@ class Calculator(QMainWindow):
             self.oldPos = None # Clear the initial position when the left mouse button is released
 
     ##
-    # @brief: Handles button clicks and performs the corresponding operations
+    # @brief: Handles button clicks, measuring them when the latency monitor is enabled
+    # @param self: The instance of the class
+    # @param button: The button text representing the action to be performed
+    #
+    def _buttonClicked(self, button):
+        if self.latency is None:
+            self._handle_button(button)
+            return
+        with self.latency.measure("button"):
+            self._handle_button(button)
+
+    ##
+    # @brief: Performs the operation of a button
     # @param self: The instance of the class
     # @param button: The button text representing the action to be performed
     # @exception ValueError: Raised when an invalid input is encountered
     # @exception Exception: Raised for other unexpected exceptions
     #
-    def _buttonClicked(self, button):
+    def _handle_button(self, button):
         
         # If the clicked button is a number, decimal point, parentheses or an operator
         if button in {"0", "1", "2", "3", "4", "5", "6", "7", "8", "9", ".", "(", ")", "÷", "×", "-", "+"}:
             
-            self.display.insert(button) # Add the button text to the display
-            self._adjust_font_size() # Adjust the font size based on the display content
-            current_length = len(self.display.text()) # Get the current length of the display text
-            
-            # If the display text length exceeds 15 characters, reduce the font size accordingly
-            if current_length > 15:
-                new_font_size = 30 - (current_length - 15) * 2
-                new_font_size = max(new_font_size, 10)  
-                self.display.setStyleSheet(f"""
-                    QLineEdit {{
-                        background-color: #202020;
-                        color: white;
-                        font-size: {new_font_size}px;
-                        border: none;
-                        padding: 0 10px;
-                    }}
-                """)
+            self._change_display(self.display.insert, button, shrink=True) # Add the button text to the display
 
         # If the clicked button is the equal sign
         elif button == "=":
-            try:
-                text = self.display.text() # Get the current display text
-                result = custom_eval(text) # Evaluate the expression in the display
-                formatted_result = self._format_number(str(result)) # Format the result
-                self.display.setText(formatted_result) # Set the formatted result to the display
-                self._adjust_font_size() # Adjust the font size based on the new display content
-
-                # If the display text length exceeds 15 characters, reduce the font size accordingly
-                current_length = len(self.display.text())
-                if current_length > 15:
-                    new_font_size = 30 - (current_length - 15) * 2
-                    new_font_size = max(new_font_size, 10)
-                    self.display.setStyleSheet(f"""
-                        QLineEdit {{
-                            background-color: #202020;
-                            color: white;
-                            font-size: {new_font_size}px;
-                            border: none;
-                            padding: 0 10px 
-                        }}
-                    """)
-            # Handle value errors and display an error message
-            except ValueError as e:
-                self.display.setText(str(e))
-            # Handle other exceptions and display an error message
-            except Exception as e:
-                self.display.setText(str(e))
+            self._evaluate_in_background(self._compute_expression, self.display.text())
 
         # If the clicked button is the clear button
         elif button == "C":
@@ -833,42 +1013,7 @@ class Calculator(QMainWindow):
             
         # If the clicked button is the factorial button
         elif button == "x!":
-            try:
-                text = self.display.text().replace("x!", "") # Remove the factorial symbol from the display text
-                if not text:
-                    return
-                number = int(text) # Convert the text to an integer
-                
-                # If the input is too large for calculating factorial, display an error message
-                if number > 170:
-                    self.display.setText("Exceeds limit for x!")
-                    return
-                
-                result = factorial(number) # Calculate the factorial of the input number
-                formatted_result = self._format_number(str(result)) # Format the result
-                self.display.setText(formatted_result) # Set the formatted result to the display
-                self._adjust_font_size() # Adjust the font size based on the new display content
-                
-                # If the display text length exceeds 15 characters, reduce the font size accordingly
-                current_length = len(self.display.text())
-                if current_length > 15:
-                    new_font_size = 30 - (current_length - 15) * 2
-                    new_font_size = max(new_font_size, 10)  
-                    self.display.setStyleSheet(f"""
-                        QLineEdit {{
-                            background-color: #202020;
-                            color: white;
-                            font-size: {new_font_size}px;
-                            border: none;
-                            padding: 0 10px;
-                        }}
-                    """)
-            # Handle value errors and display an error message
-            except ValueError:
-                self.display.setText("Invalid input for x!")
-            # Handle other exceptions and display an error message
-            except Exception as e:
-                self.display.setText(str(e))    
+            self._evaluate_in_background(self._compute_factorial, self.display.text())
 
         # If the clicked button is the power button button
         elif button == "x^y":
@@ -880,40 +1025,7 @@ class Calculator(QMainWindow):
 
         # If the clicked button is the "√x" button
         elif button == "√x":
-            try:
-                text = self.display.text().replace("√x", "") # Remove the square root symbol from the display text
-                if not text:
-                    return
-                number = float(text) # Convert the text to a float and calculate the square root
-                result = sqrt(number)
-                # Check if the result is a valid number
-                if not isinstance(result, (int, float)):
-                    self.display.setText("Invalid input for √x")
-                    return
-                formatted_result = self._format_number(str(result)) # Format the result and update the display
-                self.display.setText(formatted_result)
-                self._adjust_font_size()
-
-                # If the display text length exceeds 15 characters, reduce the font size accordingly
-                current_length = len(self.display.text())
-                if current_length > 15:
-                    new_font_size = 30 - (current_length - 15) * 2
-                    new_font_size = max(new_font_size, 10)
-                    self.display.setStyleSheet(f"""
-                        QLineEdit {{
-                            background-color: #202020;
-                            color: white;
-                            font-size: {new_font_size}px;
-                            border: none;
-                            padding: 0 10px;
-                        }}
-                    """)
-            # Handle value errors and display an error message
-            except ValueError as e:
-                self.display.setText(str(e))
-            # Handle other exceptions and display an error message
-            except Exception as e:
-                self.display.setText("Invalid input for √x")
+            self._evaluate_in_background(self._compute_sqrt, self.display.text())
 
         # If the clicked button is the "ln" button  
         elif button == "ln":
@@ -932,36 +1044,26 @@ class Calculator(QMainWindow):
             
             # If the expression is complete, evaluate it
             else:
-                try:
-                    result = custom_eval(text)
-                    formatted_result = self._format_number(str(result))
-                    self.display.setText(formatted_result)
-                    self._adjust_font_size()
-
-                    # If the display text length exceeds 15 characters, reduce the font size accordingly
-                    current_length = len(self.display.text())
-                    if current_length > 15:
-                        new_font_size = 30 - (current_length - 15) * 2
-                        new_font_size = max(new_font_size, 10)
-                        self.display.setStyleSheet(f"""
-                            QLineEdit {{
-                                background-color: #202020;
-                                color: white;
-                                font-size: {new_font_size}px;
-                                border: none;
-                                padding: 0 10px;
-                            }}
-                        """)
-                # Handle value errors and display an error message
-                except Exception as e:
-                    self.display.setText(str(e))
+                self._evaluate_in_background(self._compute_expression, text)
 
     ##
-    # @brief: Handles key press events for the calculator
+    # @brief: Handles key press events for the calculator, measuring them when the latency monitor is enabled
     # @param self: The instance of the class
     # @param event: The event object containing information about the key press
     #
     def keyPressEvent(self, event):
+        if self.latency is None:
+            self._handle_key(event)
+            return
+        with self.latency.measure("key"):
+            self._handle_key(event)
+
+    ##
+    # @brief: Performs the operation of a key press
+    # @param self: The instance of the class
+    # @param event: The event object containing information about the key press
+    #
+    def _handle_key(self, event):
         key = event.text() # Get the text of the pressed key
 
         # If the key is a digit, decimal, or arithmetic symbol, insert it into the display
@@ -1005,19 +1107,203 @@ class Calculator(QMainWindow):
         elif key.lower() == "p":
             self._buttonClicked("x^y")
 
+        # If the key is escape, cancel the running evaluation
+        elif event.key() == Qt.Key_Escape:
+            self._cancel_evaluation()
+
+
+    ##
+    # @brief: Starts recording the latency of key presses, button clicks and evaluations
+    # @param self: The instance of the class
+    # @param overlay: Whether the percentiles are shown over the display, refreshed twice a second
+    #
+    def enable_latency_monitor(self, overlay=False):
+        self.latency = InputLatencyMonitor(self.display, self)
+        if not overlay:
+            return
+        self.latency_overlay = QLabel(self._centralWidget)
+        self.latency_overlay.setAttribute(Qt.WA_TransparentForMouseEvents) # Clicks go to the widgets below
+        self.latency_overlay.setStyleSheet("background-color: rgba(0, 0, 0, 160); color: #80ff80; font-size: 10px;")
+        self.latency_overlay_timer = QTimer(self)
+        self.latency_overlay_timer.setInterval(500)
+        self.latency_overlay_timer.timeout.connect(self._update_latency_overlay)
+        self.latency_overlay_timer.start()
+
+    ##
+    # @brief: Shows the current percentiles in the latency overlay
+    # @param self: The instance of the class
+    #
+    def _update_latency_overlay(self):
+        summary = self.latency.summary()
+        self.latency_overlay.setText(summary)
+        self.latency_overlay.setVisible(bool(summary))
+        self.latency_overlay.adjustSize()
+        self.latency_overlay.move(self.display.geometry().topLeft()) # Placed here, the layout is done by now
+        self.latency_overlay.raise_()
 
     ##
     # @brief Show the tutorial window
     # @param self The instance of the class
     #
     def showTutorial(self):
-        # Create a new instance of the tutorial window and center it on the screen
-        tutorialWindow = TutorialWindow(self)
+        # Build the tutorial window on first use only, its labels take longer to create than the whole calculator
+        if self._tutorial_window is None:
+            self._tutorial_window = TutorialWindow(self)
+        tutorialWindow = self._tutorial_window
+
+        # Center the tutorial window on the calculator
         tutorialWindow.move(self.geometry().center() - tutorialWindow.rect().center())
         tutorialWindow.exec_() # Execute the tutorial window event loop
 
 
 
+    ##
+    # @brief: Evaluates the expression of the display, executed by a worker thread
+    # @param self: The instance of the class
+    # @param text: The display text
+    # @return: Tuple (display text, result flag); the font size is adjusted for results but not for error messages
+    #
+    def _compute_expression(self, text):
+        try:
+            # Evaluate the expression in the display, or take its result from earlier sessions and batch runs
+            result = custom_eval(text) if self.result_cache is None else self.result_cache.evaluate(text)
+            return self._format_number(str(result)), True # Format the result
+        # Handle value errors and other exceptions with an error message
+        except Exception as e:
+            return str(e), False
+
+    ##
+    # @brief: Calculates the factorial of the display, executed by a worker thread
+    # @param self: The instance of the class
+    # @param text: The display text
+    # @return: Tuple (display text, result flag), None if the display is empty
+    #
+    def _compute_factorial(self, text):
+        try:
+            text = text.replace("x!", "") # Remove the factorial symbol from the display text
+            if not text:
+                return None
+            number = int(text) # Convert the text to an integer
+
+            # If the input is too large for calculating factorial, display an error message
+            if number > 170:
+                return "Exceeds limit for x!", False
+
+            result = factorial(number) # Calculate the factorial of the input number
+            return self._format_number(str(result)), True # Format the result
+        # Handle value errors and display an error message
+        except ValueError:
+            return "Invalid input for x!", False
+        # Handle other exceptions and display an error message
+        except Exception as e:
+            return str(e), False
+
+    ##
+    # @brief: Calculates the square root of the display, executed by a worker thread
+    # @param self: The instance of the class
+    # @param text: The display text
+    # @return: Tuple (display text, result flag), None if the display is empty
+    #
+    def _compute_sqrt(self, text):
+        try:
+            text = text.replace("√x", "") # Remove the square root symbol from the display text
+            if not text:
+                return None
+            number = float(text) # Convert the text to a float and calculate the square root
+            result = sqrt(number)
+            # Check if the result is a valid number
+            if not isinstance(result, (int, float)):
+                return "Invalid input for √x", False
+            return self._format_number(str(result)), True # Format the result
+        # Handle value errors and display an error message
+        except ValueError as e:
+            return str(e), False
+        # Handle other exceptions and display an error message
+        except Exception:
+            return "Invalid input for √x", False
+
+    ##
+    # @brief: Runs a computation on a worker thread, its result is shown by _evaluation_finished
+    # @param self: The instance of the class
+    # @param function: Computation returning (display text, result flag) or None, it must not touch any widget
+    # @param text: The display text passed to the computation
+    #
+    def _evaluate_in_background(self, function, text):
+        self._job += 1 # Supersedes the evaluation that may still be running
+        worker = EvaluationWorker(self._job, function, text)
+        worker.signals.finished.connect(self._evaluation_finished)
+        worker.signals.failed.connect(self._evaluation_failed)
+        self._workers[self._job] = worker
+        self._busy = True
+        self._job_started = time.perf_counter()
+        self.busy_timer.start()
+        self.thread_pool.start(worker)
+
+    ##
+    # @brief: Shows the result of a worker in the display
+    # @param self: The instance of the class
+    # @param job: Id of the finished job
+    # @param outcome: Tuple (display text, result flag) or None
+    #
+    def _evaluation_finished(self, job, outcome):
+        self._workers.pop(job, None)
+        # Results of cancelled or superseded evaluations are dropped
+        if job != self._job or not self._busy:
+            return
+        if self.latency is not None:
+            self.latency.record("evaluation", time.perf_counter() - self._job_started)
+        self._set_idle()
+        if outcome is None:
+            return
+        text, is_result = outcome
+        self._change_display(self.display.setText, text, shrink=is_result) # Long results shrink, error messages do not
+
+    ##
+    # @brief: Shows the exception of a worker in the display
+    # @param self: The instance of the class
+    # @param job: Id of the failed job
+    # @param error: The exception raised by the computation
+    #
+    def _evaluation_failed(self, job, error):
+        self._evaluation_finished(job, (str(error), False))
+
+    ##
+    # @brief: Shows the busy indicator for an evaluation that is still running
+    # @param self: The instance of the class
+    #
+    def _show_busy(self):
+        if not self._busy or self._busy_shown:
+            return
+        self._busy_shown = True
+        QApplication.setOverrideCursor(Qt.BusyCursor)
+        self.preview.setText("Calculating... (Esc to cancel)")
+
+    ##
+    # @brief: Hides the busy indicator
+    # @param self: The instance of the class
+    #
+    def _set_idle(self):
+        self._busy = False
+        self.busy_timer.stop()
+        if self._busy_shown:
+            self._busy_shown = False
+            QApplication.restoreOverrideCursor()
+            self.preview.clear()
+
+    ##
+    # @brief: Cancels the running evaluation, the display keeps the expression
+    # @param self: The instance of the class
+    # @param text: The new display text when called for an edit of the display, unused
+    #
+    # Python threads can not be interrupted, the worker runs to completion and its result is dropped.
+    #
+    def _cancel_evaluation(self, text=None):
+        if not self._busy:
+            return
+        self._job += 1
+        self._set_idle()
+        self.preview_timer.start() # Bring back the live preview of the expression
+
     ##
     # @brief: Format a number string with thousands separators
     # @param self: The instance of the class
@@ -1036,13 +1322,122 @@ class Calculator(QMainWindow):
             return '{:,}'.format(int(number))
         
     
+    ##
+    # @brief: Restarts the debounce timer of the live preview
+    # @param self: The instance of the class
+    # @param text: The new display text, unused
+    #
+    def _schedule_preview(self, text):
+        self._preview_job += 1 # The running preview is of the old text
+        self.preview_timer.start()
+
+    ##
+    # @brief: Starts evaluating the preview of the expression in the display on a worker thread
+    # @param self: The instance of the class
+    #
+    def _update_preview(self):
+        # The busy indicator keeps the label until the evaluation ends
+        if self._busy_shown:
+            return
+        try:
+            program = self.preview_parser.parse(self.display.text()) # Only the characters after the unchanged prefix are parsed
+        # Incomplete or invalid expressions have no preview
+        except Exception:
+            self.preview.clear()
+            return
+        # A plain number, e.g. the result after '=', is not previewed again
+        if len(program) < 2:
+            self.preview.clear()
+            return
+        self._preview_job += 1
+        worker = EvaluationWorker(self._preview_job, self._compute_preview, program)
+        worker.signals.finished.connect(self._preview_finished)
+        worker.signals.failed.connect(self._preview_failed)
+        self._preview_workers[self._preview_job] = worker
+        self.thread_pool.start(worker)
+
+    ##
+    # @brief: Evaluates the parsed expression for the preview, executed by a worker thread
+    # @param self: The instance of the class
+    # @param program: RPN program of the display text
+    # @return: Text of the preview label
+    #
+    def _compute_preview(self, program):
+        return "= " + self._format_number(str(evaluate_program(program)))
+
+    ##
+    # @brief: Shows the preview computed by a worker under the display
+    # @param self: The instance of the class
+    # @param job: Id of the finished preview job
+    # @param text: Text of the preview label
+    #
+    def _preview_finished(self, job, text):
+        self._preview_workers.pop(job, None)
+        # Previews of an older display text, or finishing while the busy indicator is shown, are dropped
+        if job != self._preview_job or self._busy_shown:
+            return
+        self.preview.setText(text)
+
+    ##
+    # @brief: Clears the preview of an expression that can not be evaluated
+    # @param self: The instance of the class
+    # @param job: Id of the failed preview job
+    # @param error: The exception raised by the evaluation
+    #
+    def _preview_failed(self, job, error):
+        self._preview_workers.pop(job, None)
+        if job != self._preview_job or self._busy_shown:
+            return
+        self.preview.clear()
+
+    ##
+    # @brief: Changes the display text and fits the display style to it
+    # @param self: The instance of the class
+    # @param change: Method changing the text, self.display.insert or self.display.setText
+    # @param text: Argument of change
+    # @param shrink: Whether text longer than 15 characters gets the smaller frameless font, as button input and results do
+    #
+    def _change_display(self, change, text, shrink):
+        self._shrink_long_text = shrink # Read by _adjust_font_size, which runs on textChanged
+        try:
+            change(text)
+            if shrink:
+                self._adjust_font_size() # Also when the text did not change, e.g. at the maximal length
+        finally:
+            self._shrink_long_text = False
+
+    ##
+    # @brief: Applies a display style, switching between cached fonts and the two stylesheets
+    # @param self: The instance of the class
+    # @param font_size: Font size in pixels
+    # @param framed: Whether the display has the white frame
+    #
+    def _set_display_style(self, font_size, framed):
+        if self._display_style == (font_size, framed):
+            return
+        # The stylesheet is only re-parsed when the frame changes
+        if self._display_style is None or self._display_style[1] != framed:
+            self.display.setStyleSheet(DISPLAY_STYLE_FRAMED if framed else DISPLAY_STYLE_FRAMELESS)
+        font = self._display_fonts.get(font_size)
+        if font is None:
+            font = QFont(self.display.font())
+            font.setPixelSize(font_size)
+            self._display_fonts[font_size] = font
+        self.display.setFont(font)
+        self._display_style = (font_size, framed)
+
     ##
     # @brief: Adjusts the font size of the display based on the length of the text
     # @param self: The instance of the class
     #
     def _adjust_font_size(self):
         current_length = len(self.display.text()) # Get the current length of the display text
-        
+
+        # Long button input and results use a smaller font without the frame
+        if self._shrink_long_text and current_length > 15:
+            self._set_display_style(max(30 - (current_length - 15) * 2, 10), False)
+            return
+
         # Determine the appropriate font size based on the length of the display text
         if current_length <= 17:
             new_font_size = 30
@@ -1052,18 +1447,7 @@ class Calculator(QMainWindow):
             new_font_size = 23
         else:
             new_font_size = 20
-
-        # Apply the new font size and style to the display
-        self.display.setStyleSheet(f"""
-            QLineEdit {{
-                background-color: #202020;
-                color: white;
-                font-size: {new_font_size}px;
-                border: 2px solid white;
-                padding: 0 10px;
-                text-align: right;
-            }}
-        """)
+        self._set_display_style(new_font_size, True)
 
 
 ##
@@ -1073,4 +1457,40 @@ if __name__ == "__main__":
     app = QApplication(sys.argv) # Create a QApplication instance with command-line arguments
     app.setStyle("Fusion") # Set the application style to "Fusion"
     calc = Calculator() # Create a Calculator instance
-    sys.exit(app.exec_()) # Start the application event loop and exit with the returned exit code
+
+    # With --startup-profile, report the time to the first paint of the window
+    if "--startup-profile" in sys.argv:
+        profiler = StartupProfiler(calc, time.perf_counter())
+
+    # With --lag-monitor, report how long the event loop was blocked on exit
+    monitor = None
+    if "--lag-monitor" in sys.argv:
+        monitor = EventLoopMonitor()
+        monitor.start()
+
+    # With --latency-report PATH, write the percentiles of the input latency to PATH on exit;
+    # with --latency-overlay, show them over the display while typing
+    latency_report = None
+    if "--latency-report" in sys.argv[:-1]:
+        latency_report = sys.argv[sys.argv.index("--latency-report") + 1]
+    if latency_report is not None or "--latency-overlay" in sys.argv:
+        calc.enable_latency_monitor(overlay="--latency-overlay" in sys.argv)
+
+    # With --result-cache [PATH], share the results of '=' with other sessions and batch_eval.py --cache
+    if "--result-cache" in sys.argv:
+        from result_cache import PersistentResultCache, default_cache_path # Imported on demand, sqlite3 slows the startup
+        position = sys.argv.index("--result-cache") + 1
+        if position < len(sys.argv) and not sys.argv[position].startswith("-"):
+            calc.result_cache = PersistentResultCache(sys.argv[position])
+        else:
+            calc.result_cache = PersistentResultCache(default_cache_path())
+
+    status = app.exec_() # Start the application event loop
+    if monitor is not None:
+        print(monitor.report(), file=sys.stderr)
+    if latency_report is not None:
+        calc.latency.write(latency_report)
+    if calc.result_cache is not None:
+        calc.thread_pool.waitForDone() # Workers may still be storing results
+        calc.result_cache.close()
+    sys.exit(status) # Exit with the returned exit code
@@ -0,0 +1,124 @@
+#!/usr/bin/python3
+
+##
+# @file: profiler.py
+# @brief: CPU and allocation profiling of the command line tools for IVS project 2.
+# @author: X
+# @Created: 2026-10-17
+# @Last Modified: 2026-10-17
+##
+
+# @brief: cProfile and tracemalloc behind the --profile option of stddev.py and batch_eval.py
+
+import argparse
+import cProfile
+import pstats
+import random
+import sys
+import tracemalloc
+from contextlib import contextmanager
+
+# Number of functions and allocation sites listed in the text summaries
+PROFILE_TOP = 20
+
+# Seed of the generated data sets, the same as the stddev benchmarks use
+DATASET_SEED = 2023
+
+
+##
+# @brief: Profiles the enclosed block with cProfile and tracemalloc and writes the results
+# @param prefix: Path prefix of the written files, nothing is profiled when it is None
+# @param top: Number of entries in the text summaries
+#
+# Writes prefix.pstats (loadable with pstats or snakeviz), prefix.cpu.txt with the functions of the highest
+# cumulative time and prefix.alloc.txt with the peak of traced memory and the allocation sites still holding memory
+# at the end of the block. Tracing allocations slows Python code down, so compare CPU times only between profiled runs.
+#
+@contextmanager
+def profiled(prefix, top=PROFILE_TOP):
+    if prefix is None:
+        yield
+        return
+    tracemalloc.start()
+    profile = cProfile.Profile()
+    profile.enable()
+    try:
+        yield
+    finally:
+        profile.disable()
+        snapshot = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        write_profile(prefix, profile, snapshot, peak, top)
+
+##
+# @brief: Writes the profile files
+# @param prefix: Path prefix of the written files
+# @param profile: Disabled cProfile.Profile
+# @param snapshot: tracemalloc.Snapshot taken at the end of the profiled block
+# @param peak: Peak of traced memory in bytes
+# @param top: Number of entries in the text summaries
+#
+def write_profile(prefix, profile, snapshot, peak, top=PROFILE_TOP):
+    profile.dump_stats(prefix + ".pstats")
+    with open(prefix + ".cpu.txt", "w", encoding="utf-8") as handle:
+        stats = pstats.Stats(profile, stream=handle)
+        stats.sort_stats("cumulative").print_stats(top)
+
+    # Allocations of the profiler itself are not part of the measured program
+    snapshot = snapshot.filter_traces((tracemalloc.Filter(False, tracemalloc.__file__),
+                                       tracemalloc.Filter(False, cProfile.__file__),
+                                       tracemalloc.Filter(False, __file__)))
+    statistics = snapshot.statistics("lineno")
+    with open(prefix + ".alloc.txt", "w", encoding="utf-8") as handle:
+        handle.write("peak traced memory: %.1f KiB\n" % (peak / 1024))
+        handle.write("held at the end: %.1f KiB in %d blocks\n" % (
+            sum(stat.size for stat in statistics) / 1024, sum(stat.count for stat in statistics)))
+        handle.write("top %d allocation sites held at the end:\n" % top)
+        for stat in statistics[:top]:
+            handle.write("%s\n" % stat)
+    print("profile written to %s.{pstats,cpu.txt,alloc.txt}" % prefix, file=sys.stderr)
+
+##
+# @brief: Generates a reproducible data set like the stored 1000 sample set, random integers in 1..999
+# @param count: Number of samples
+# @param seed: Seed of the random generator
+# @return: Generator yielding the samples
+#
+def generate_dataset(count, seed=DATASET_SEED):
+    rng = random.Random(seed)
+    for _ in range(count):
+        yield rng.randint(1, 999)
+
+##
+# @brief: Generates a reproducible list of expressions for the evaluator
+# @param count: Number of expressions
+# @param seed: Seed of the random generator
+# @return: Generator yielding expressions of 1 to 8 operands with the calculator operators
+#
+def generate_expressions(count, seed=DATASET_SEED):
+    rng = random.Random(seed)
+    for _ in range(count):
+        parts = [str(rng.randint(1, 999))]
+        for _ in range(rng.randint(0, 7)):
+            parts.append(rng.choice("+-×÷"))
+            parts.append(str(rng.randint(1, 999)) if rng.random() < 0.8 else "%d.%d" % (rng.randint(0, 99), rng.randint(1, 99)))
+        yield "".join(parts)
+
+##
+# @brief: Writing a generated data set or expression list to standard output
+# @param argv: Command line arguments, defaults to sys.argv
+#
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate the reproducible inputs of the profiling runs.")
+    parser.add_argument("kind", choices=("dataset", "expressions"),
+                        help="numbers for stddev.py or expressions for batch_eval.py")
+    parser.add_argument("count", type=int, help="number of lines")
+    parser.add_argument("--seed", type=int, default=DATASET_SEED, help="seed of the random generator")
+    args = parser.parse_args(argv)
+    generate = generate_dataset if args.kind == "dataset" else generate_expressions
+    sys.stdout.writelines("%s\n" % line for line in generate(args.count, args.seed))
+
+
+if __name__ == "__main__":
+    main()
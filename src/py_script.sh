@@ -2,6 +2,8 @@ chmod +x ../installer/DEBIAN/postinst
 mkdir -p ../installer/usr/share/calculator
 cp  math_lib.py ../installer/usr/share/calculator/math_lib.py
 cp  extended_math_lib.py ../installer/usr/share/calculator/extended_math_lib.py
+cp  calc_engine.py ../installer/usr/share/calculator/calc_engine.py
+cp  result_cache.py ../installer/usr/share/calculator/result_cache.py
 cp  gui.py ../installer/usr/share/calculator/gui.py
 chmod +x ../installer/usr/share/calculator/gui.py
 mkdir -p ../installer/usr/share/applications
@@ -2,6 +2,7 @@ chmod +x ../installer/DEBIAN/postinst
 mkdir -p ../installer/usr/share/deviation
 cp  math_lib.py ../installer/usr/share/deviation/math_lib.py
 cp  extended_math_lib.py ../installer/usr/share/deviation/extended_math_lib.py
+cp  profiler.py ../installer/usr/share/deviation/profiler.py
 cp  stddev.py ../installer/usr/share/deviation/stddev.py
 chmod +x ../installer/usr/share/deviation/stddev.py
 mkdir -p ../installer/usr/local/bin
@@ -0,0 +1,313 @@
+#!/usr/bin/python3
+
+##
+# @file: result_cache.py
+# @brief: Persistent cache of evaluation results for IVS project 2.
+# @author: X
+# @Created: 2026-10-17
+# @Last Modified: 2026-10-17
+##
+
+# @brief: Results and errors of custom_eval kept in an sqlite database shared by GUI sessions and batch runs
+
+import argparse
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+import calc_engine
+import extended_math_lib
+import math_lib
+from calc_engine import ExpressionSyntaxError, custom_eval
+
+# Maximum number of stored results before the least recently used ones are evicted
+DEFAULT_MAX_ENTRIES = 100000
+
+# Number of new results and hits kept in memory before they are written to the database
+COMMIT_EVERY = 1000
+
+# Changed together with the layout of the database, invalidates all stored results
+SCHEMA_VERSION = 1
+
+# Exceptions of custom_eval that are stored as results, other exceptions are raised without caching them
+CACHED_ERRORS = {error.__name__: error for error in (ExpressionSyntaxError, ValueError, ZeroDivisionError, OverflowError)}
+
+# Types of stored values
+VALUE_TYPES = {"int": int, "float": float}
+
+
+##
+# @brief: Default location of the cache, shared by all users of the same account
+# @return: Path to results.sqlite in the XDG cache directory
+#
+def default_cache_path():
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "ivs-calculator", "results.sqlite")
+
+##
+# @brief: Version stamp of the evaluation semantics
+# @return: Hash of the database layout and of the sources of the engine and the math libraries
+#
+def library_version():
+    digest = hashlib.sha256(b"schema %d" % SCHEMA_VERSION)
+    for module in (math_lib, extended_math_lib, calc_engine):
+        with open(module.__file__, "rb") as source:
+            digest.update(source.read())
+    return digest.hexdigest()[:16]
+
+##
+# @brief: Normalizes an expression to the key of its result
+# @param expression: Expression as passed to PersistentResultCache.evaluate
+# @return: The expression without surrounding whitespace, the text that is evaluated and stored
+#
+# Whitespace inside the expression is kept, "1 2" is an error while "12" is not.
+#
+def normalize_expression(expression):
+    return expression.strip()
+
+
+##
+# @brief: LRU cache of custom_eval results in an sqlite database, with hit/miss/eviction counters
+#
+# The cache can be shared by the threads of one process and by several processes. Hits and new results are collected
+# in memory and written every COMMIT_EVERY changes, by commit and by close; a result computed by two processes at
+# once is simply stored twice. The least recently used entries are evicted at commit.
+#
+class PersistentResultCache:
+    ##
+    # @brief: Opens or creates the database, dropping all results stored by another version of the math libraries
+    # @param self: Instance of the PersistentResultCache class
+    # @param path: Path to the database file, missing directories are created
+    # @param maxsize: Maximum number of stored results
+    # @param version: Version stamp, defaults to library_version()
+    #
+    def __init__(self, path, maxsize=DEFAULT_MAX_ENTRIES, version=None):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.maxsize = maxsize
+        self.version = version or library_version()
+        self.hits = 0 # Counters of this session
+        self.misses = 0
+        self.evictions = 0
+        self._pending = {} # New rows by key, not yet written
+        self._touched = {} # Last use of hit keys by key, not yet written
+        self._written_hits = 0 # Part of the counters already added to the totals in the database
+        self._written_misses = 0
+        self._lock = threading.Lock() # The GUI evaluates on several worker threads
+
+        self._connection = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        with self._connection:
+            self._connection.execute("PRAGMA journal_mode=WAL") # Readers do not block the writer of another process
+            self._connection.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT)")
+            self._connection.execute("CREATE TABLE IF NOT EXISTS results (expression TEXT, exact INTEGER, kind TEXT, "
+                                     "value TEXT, position INTEGER, used REAL, PRIMARY KEY (expression, exact))")
+            self._connection.execute("CREATE INDEX IF NOT EXISTS results_used ON results (used)")
+            if self._meta("version") != self.version:
+                self._connection.execute("DELETE FROM results")
+                self._connection.executemany("INSERT OR REPLACE INTO meta VALUES (?, ?)",
+                                             (("version", self.version), ("hits", "0"), ("misses", "0")))
+
+    ##
+    # @brief: Reads a value of the meta table
+    # @param self: Instance of the PersistentResultCache class
+    # @param name: Name of the value
+    # @return: The value, None if it is not set
+    #
+    def _meta(self, name):
+        row = self._connection.execute("SELECT value FROM meta WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else None
+
+    ##
+    # @brief: Evaluates the normalized expression with custom_eval, returning the stored result or error when there is one
+    # @param self: Instance of the PersistentResultCache class
+    # @param expression: String containing the mathematical expression
+    # @param exact: Evaluate in the exact-integer mode of custom_eval
+    # @return: Result of the evaluation
+    # @exception: The error custom_eval raised for the normalized expression, also when it was stored; error
+    #             positions refer to expression
+    #
+    # The normalized expression is evaluated also on a miss, so that the result never depends on the cache content.
+    #
+    def evaluate(self, expression, exact=False):
+        key = (normalize_expression(expression), int(exact))
+        offset = len(expression) - len(expression.lstrip()) # Error positions are stored for the normalized expression
+        row = self._lookup(key)
+        if row is None:
+            try:
+                value = custom_eval(key[0], exact)
+            except tuple(CACHED_ERRORS.values()) as e:
+                # Subclasses that are not listed could not be raised again from the stored row
+                if type(e).__name__ in CACHED_ERRORS:
+                    position = getattr(e, "position", None)
+                    self._store(key, (type(e).__name__, str(e), position))
+                    if position is not None:
+                        e.position = position + offset
+                raise
+            if type(value).__name__ in VALUE_TYPES:
+                self._store(key, (type(value).__name__, repr(value), None))
+            return value
+
+        kind, value, position = row
+        if kind in VALUE_TYPES:
+            return VALUE_TYPES[kind](value)
+        if position is None:
+            raise CACHED_ERRORS[kind](value)
+        raise CACHED_ERRORS[kind](value, position + offset)
+
+    ##
+    # @brief: Looks up a stored result and marks it as most recently used
+    # @param self: Instance of the PersistentResultCache class
+    # @param key: Tuple (normalized expression, exact flag)
+    # @return: Tuple (kind, value text, error position) or None if the result is not stored
+    #
+    def _lookup(self, key):
+        with self._lock:
+            row = self._pending.get(key)
+            if row is None:
+                row = self._connection.execute("SELECT kind, value, position FROM results "
+                                               "WHERE expression = ? AND exact = ?", key).fetchone()
+            # Results of other value types, e.g. stored by a newer version sharing the file, count as misses
+            if row is None or (row[0] not in VALUE_TYPES and row[0] not in CACHED_ERRORS):
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._touched[key] = time.time()
+            if len(self._touched) >= COMMIT_EVERY:
+                self._write()
+            return row
+
+    ##
+    # @brief: Stores a new result
+    # @param self: Instance of the PersistentResultCache class
+    # @param key: Tuple (normalized expression, exact flag)
+    # @param row: Tuple (kind, value text, error position)
+    #
+    def _store(self, key, row):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._pending[key] = row
+            if len(self._pending) >= COMMIT_EVERY:
+                self._write()
+
+    ##
+    # @brief: Writes the collected results, hits and counters and evicts the least recently used results
+    # @param self: Instance of the PersistentResultCache class
+    #
+    def _write(self):
+        now = time.time()
+        hits = self.hits - self._written_hits
+        misses = self.misses - self._written_misses
+        with self._connection:
+            self._connection.executemany("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?)",
+                                         (key + row + (now,) for key, row in self._pending.items()))
+            self._connection.executemany("UPDATE results SET used = ? WHERE expression = ? AND exact = ?",
+                                         ((used,) + key for key, used in self._touched.items()))
+            self._connection.execute("UPDATE meta SET value = value + ? WHERE name = 'hits'", (hits,))
+            self._connection.execute("UPDATE meta SET value = value + ? WHERE name = 'misses'", (misses,))
+            excess = self._connection.execute("SELECT COUNT(*) FROM results").fetchone()[0] - self.maxsize
+            if excess > 0:
+                self._connection.execute("DELETE FROM results WHERE rowid IN "
+                                         "(SELECT rowid FROM results ORDER BY used LIMIT ?)", (excess,))
+                self.evictions += excess
+        self._pending.clear()
+        self._touched.clear()
+        self._written_hits += hits
+        self._written_misses += misses
+
+    ##
+    # @brief: Writes the collected results and counters to the database
+    # @param self: Instance of the PersistentResultCache class
+    #
+    def commit(self):
+        with self._lock:
+            self._write()
+
+    ##
+    # @brief: Writes the collected results and closes the database
+    # @param self: Instance of the PersistentResultCache class
+    #
+    def close(self):
+        with self._lock:
+            self._write()
+            self._connection.close()
+
+    ##
+    # @brief: Enters the with statement
+    # @param self: Instance of the PersistentResultCache class
+    # @return: The cache
+    #
+    def __enter__(self):
+        return self
+
+    ##
+    # @brief: Closes the cache at the end of the with statement
+    # @param self: Instance of the PersistentResultCache class
+    #
+    def __exit__(self, *exc_info):
+        self.close()
+
+    ##
+    # @brief: Statistics of the cache
+    # @param self: Instance of the PersistentResultCache class
+    # @return: Dictionary with the stored entries, the counters of this session and the totals of all sessions
+    #          since the version stamp changed, including the counters of other processes written so far
+    #
+    def stats(self):
+        with self._lock:
+            entries = self._connection.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+            # Pending results replace stored rows of the same key, e.g. rows of other value types; the next write
+            # evicts down to maxsize
+            entries += sum(1 for key in self._pending if self._connection.execute(
+                "SELECT 1 FROM results WHERE expression = ? AND exact = ?", key).fetchone() is None)
+            entries = min(entries, max(self.maxsize, 0))
+            total_hits = int(self._meta("hits")) + self.hits - self._written_hits
+            total_misses = int(self._meta("misses")) + self.misses - self._written_misses
+        lookups = self.hits + self.misses
+        total_lookups = total_hits + total_misses
+        return {
+            "entries": entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "total_hits": total_hits,
+            "total_misses": total_misses,
+            "total_hit_rate": total_hits / total_lookups if total_lookups else 0.0,
+        }
+
+    ##
+    # @brief: Summarizes the statistics
+    # @param self: Instance of the PersistentResultCache class
+    # @return: One line report
+    #
+    def report(self):
+        stats = self.stats()
+        return "result cache: %d entries, %d hits, %d misses (%.1f %% hit rate), %.1f %% hit rate overall" % (
+            stats["entries"], stats["hits"], stats["misses"], stats["hit_rate"] * 100, stats["total_hit_rate"] * 100)
+
+
+##
+# @brief: Printing the statistics of a cache or clearing it
+# @param argv: Command line arguments, defaults to sys.argv
+#
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Show the statistics of the persistent result cache.")
+    parser.add_argument("path", nargs="?", default=default_cache_path(), help="database file, default %(default)s")
+    parser.add_argument("--clear", action="store_true", help="remove all stored results and reset the statistics")
+    args = parser.parse_args(argv)
+    # A cleared cache is one whose version stamp does not match any version of the math libraries
+    if args.clear:
+        PersistentResultCache(args.path, version="cleared").close()
+    with PersistentResultCache(args.path) as cache:
+        stats = cache.stats()
+        print("version %s, %d entries, %d hits, %d misses (%.1f %% hit rate)" % (
+            cache.version, stats["entries"], stats["total_hits"], stats["total_misses"], stats["total_hit_rate"] * 100))
+
+
+if __name__ == "__main__":
+    main()
@@ -5,15 +5,31 @@
 # @brief: Standard deviation for IVS project 2.
 # @author: X
 # @Created: 2023-03-23
-# @Last Modified: 2023-03-28
+# @Last Modified: 2026-10-17
 ##
 
 # @brief: Calculating standard deviation using math libraries math_lib.py, extended_math_lib.py
 
+import argparse
+import json
+import mmap
+import os
+import re
 import sys
+from array import array
+from concurrent.futures import ProcessPoolExecutor
 
 import extended_math_lib
 import math_lib
+from profiler import PROFILE_TOP, profiled
+
+try:
+    import numpy
+except ImportError:  # NumPy is optional, the pure-Python backend is used without it
+    numpy = None
+
+# Backends selectable with --backend; "auto" prefers NumPy when it is installed
+BACKENDS = ("auto", "python", "numpy")
 
 
 ##
@@ -53,13 +69,425 @@ def standard_deviation(data):
     std_dev =extended_math_lib.sqrt(variance)
     return std_dev
 
+# Number of characters read from the input at once in streaming mode
+CHUNK_SIZE = 1 << 16
+
+##
+# @brief: Reads numbers from a text stream in fixed-size chunks
+# @param stream: Text stream with whitespace separated numbers
+# @param chunk_size: Number of characters read at once
+# @return: Generator yielding the numbers as floats
+#
+def iter_numbers(stream, chunk_size=CHUNK_SIZE):
+    tail = ''
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        tokens = (tail + chunk).split()
+        # A token touching the end of the chunk may continue in the next one
+        if tokens and not chunk[-1].isspace():
+            tail = tokens.pop()
+        else:
+            tail = ''
+        for token in tokens:
+            yield float(token)
+    if tail:
+        yield float(tail)
+
+##
+# @brief: Running statistics (Welford's online algorithm)
+# @param numbers: Iterable of numbers, consumed in a single pass
+# @return: Tuple (count, mean, M2) where M2 is the sum of squared deviations from the mean
+#
+def running_statistics(numbers):
+    count = 0
+    mean = 0.0
+    m2 = 0.0
+    for x in numbers:
+        count += 1
+        delta = x - mean
+        mean += delta / count
+        m2 += delta * (x - mean)
+    return count, mean, m2
+
 ##
-# @brief: Retrieving data from input text file, printing result of standard deviation to standard output 
+# @brief: Standard deviation from running statistics
+# @param count: Number of samples
+# @param m2: Sum of squared deviations from the mean
+# @return: Sample standard deviation
+# @exception ValueError if there are no samples
 #
-data = []
-for line in sys.stdin:
-    	for num in line.split():
-        	data.append(float(num))
+def standard_deviation_from_m2(count, m2):
+    if count == 0:
+        raise ValueError("No input data")
+    variance = math_lib.div(m2, math_lib.sub(count, 1))
+    return extended_math_lib.sqrt(variance)
+
+##
+# @brief: Streaming standard deviation, keeps O(1) state regardless of the input size
+# @param stream: Text stream with whitespace separated numbers
+# @param chunk_size: Number of characters read at once
+# @return: Standard deviation of numbers from the stream
+#
+def streaming_standard_deviation(stream, chunk_size=CHUNK_SIZE):
+    count, mean, m2 = running_statistics(iter_numbers(stream, chunk_size))
+    return standard_deviation_from_m2(count, m2)
+
+##
+# @brief: Merges running statistics of two disjoint data sets (Chan's parallel algorithm)
+# @param a: Tuple (count, mean, M2) of the first data set
+# @param b: Tuple (count, mean, M2) of the second data set
+# @return: Tuple (count, mean, M2) of the union of both data sets
+#
+def merge_statistics(a, b):
+    count_a, mean_a, m2_a = a
+    count_b, mean_b, m2_b = b
+    count = count_a + count_b
+    if count == 0:
+        return 0, 0.0, 0.0
+    delta = mean_b - mean_a
+    mean = mean_a + delta * count_b / count
+    m2 = m2_a + m2_b + delta * delta * count_a * count_b / count
+    return count, mean, m2
+
+##
+# @brief: Running moments up to the fourth (Welford's online algorithm extended by Terriberry) with the extremes
+# @param numbers: Iterable of numbers, consumed in a single pass
+# @return: Tuple (count, mean, M2, M3, M4, minimum, maximum) where Mk is the sum of k-th powers of deviations
+#          from the mean; minimum and maximum are None without samples
+#
+def running_moments(numbers):
+    count = 0
+    mean = m2 = m3 = m4 = 0.0
+    minimum = maximum = None
+    for x in numbers:
+        previous = count
+        count += 1
+        delta = x - mean
+        delta_n = delta / count
+        delta_n2 = delta_n * delta_n
+        term = delta * delta_n * previous
+        mean += delta_n
+        # The higher moments are updated first, they use the lower ones of the previous step
+        m4 += term * delta_n2 * (count * count - 3 * count + 3) + 6 * delta_n2 * m2 - 4 * delta_n * m3
+        m3 += term * delta_n * (count - 2) - 3 * delta_n * m2
+        m2 += term
+        if minimum is None:
+            minimum = maximum = x
+        elif x < minimum:
+            minimum = x
+        elif x > maximum:
+            maximum = x
+    return count, mean, m2, m3, m4, minimum, maximum
+
+##
+# @brief: Merges running moments of two disjoint data sets (Chan's parallel algorithm generalized by Pebay)
+# @param a: Tuple (count, mean, M2, M3, M4, minimum, maximum) of the first data set
+# @param b: Tuple (count, mean, M2, M3, M4, minimum, maximum) of the second data set
+# @return: Tuple (count, mean, M2, M3, M4, minimum, maximum) of the union of both data sets
+#
+def merge_moments(a, b):
+    count_a, mean_a, m2_a, m3_a, m4_a, min_a, max_a = a
+    count_b, mean_b, m2_b, m3_b, m4_b, min_b, max_b = b
+    if count_a == 0:
+        return b
+    if count_b == 0:
+        return a
+    count = count_a + count_b
+    delta = mean_b - mean_a
+    delta_n = delta / count
+    mean = mean_a + delta_n * count_b
+    m2 = m2_a + m2_b + delta * delta_n * count_a * count_b
+    m3 = (m3_a + m3_b + delta * delta_n * delta_n * count_a * count_b * (count_a - count_b)
+          + 3 * delta_n * (count_a * m2_b - count_b * m2_a))
+    m4 = (m4_a + m4_b
+          + delta * delta_n ** 3 * count_a * count_b * (count_a * count_a - count_a * count_b + count_b * count_b)
+          + 6 * delta_n * delta_n * (count_a * count_a * m2_b + count_b * count_b * m2_a)
+          + 4 * delta_n * (count_a * m3_b - count_b * m3_a))
+    return count, mean, m2, m3, m4, min(min_a, min_b), max(max_a, max_b)
+
+##
+# @brief: Summary statistics from running moments
+# @param moments: Tuple (count, mean, M2, M3, M4, minimum, maximum)
+# @return: Dictionary with count, min, max, mean, the sample variance and standard deviation (n - 1 in the
+#          denominator, as standard_deviation uses), the skewness g1 and the excess kurtosis g2; statistics that are
+#          undefined for the data, e.g. the variance of one sample or the skewness of constant data, are None
+# @exception ValueError if there are no samples
+#
+def summary_from_moments(moments):
+    count, mean, m2, m3, m4, minimum, maximum = moments
+    if count == 0:
+        raise ValueError("No input data")
+    variance = m2 / (count - 1) if count > 1 else None
+    return {
+        "count": count,
+        "min": minimum,
+        "max": maximum,
+        "mean": mean,
+        "variance": variance,
+        "stddev": extended_math_lib.sqrt(variance) if variance is not None else None,
+        "skewness": count ** 0.5 * m3 / m2 ** 1.5 if m2 > 0 else None,
+        "kurtosis": count * m4 / (m2 * m2) - 3 if m2 > 0 else None,
+    }
+
+##
+# @brief: Text stream over a byte range of a file
+#
+class _ShardReader:
+    ##
+    # @brief: Positions the binary file handle at the start of the range
+    # @param handle: File opened in binary mode
+    # @param start: Offset of the first byte of the range
+    # @param end: Offset one past the last byte of the range
+    #
+    def __init__(self, handle, start, end):
+        handle.seek(start)
+        self._handle = handle
+        self._remaining = end - start
+
+    ##
+    # @brief: Reads at most size characters without crossing the end of the range
+    # @param size: Maximum number of characters
+    # @return: Decoded text, empty at the end of the range
+    #
+    def read(self, size):
+        data = self._handle.read(min(size, self._remaining))
+        self._remaining -= len(data)
+        return data.decode("latin-1")
+
+##
+# @brief: Splits a file into byte ranges whose boundaries fall on whitespace
+# @param path: Path to the input file
+# @param shards: Requested number of shards
+# @return: List of (start, end) byte offsets covering the whole file
+#
+def shard_ranges(path, shards):
+    size = os.path.getsize(path)
+    shards = max(1, min(shards, size))
+    boundaries = [0]
+    with open(path, "rb") as handle:
+        for i in range(1, shards):
+            position = max(size * i // shards, boundaries[-1])
+            handle.seek(position)
+            # Move the boundary forward to the next whitespace so that no number is split
+            while position < size:
+                block = handle.read(256)
+                offsets = [block.find(c) for c in (b" ", b"\n", b"\t", b"\r")]
+                offsets = [offset for offset in offsets if offset >= 0]
+                if offsets:
+                    position += min(offsets)
+                    break
+                position += len(block)
+            boundaries.append(min(position, size))
+    boundaries.append(size)
+    return [(start, end) for start, end in zip(boundaries, boundaries[1:]) if end > start]
+
+##
+# @brief: Reduces one shard of a file, executed in a worker process
+# @param reducer: Module-level function reducing an iterable of numbers in one pass, e.g. running_statistics
+# @param path: Path to the input file
+# @param start: Offset of the first byte of the shard
+# @param end: Offset one past the last byte of the shard
+# @return: Result of reducer for the numbers in the shard
+#
+def shard_reduce(reducer, path, start, end):
+    with open(path, "rb") as handle:
+        return reducer(iter_numbers(_ShardReader(handle, start, end)))
+
+##
+# @brief: Reduces a file in shards on a pool of worker processes and merges the partial results
+# @param path: Path to the input file
+# @param jobs: Number of worker processes, defaults to the number of CPUs
+# @param reducer: Module-level function reducing an iterable of numbers in one pass, e.g. running_statistics
+# @param merge: Function merging the results of reducer for two disjoint data sets, e.g. merge_statistics
+# @param identity: Result of reducer for no numbers
+# @return: Result of reducer for all numbers of the file
+#
+def sharded_reduce(path, jobs, reducer, merge, identity):
+    jobs = jobs or os.cpu_count() or 1
+    ranges = shard_ranges(path, jobs)
+    if jobs == 1 or len(ranges) <= 1:
+        partials = [shard_reduce(reducer, path, start, end) for start, end in ranges]
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            partials = list(pool.map(shard_reduce, [reducer] * len(ranges), [path] * len(ranges),
+                                     [start for start, _ in ranges], [end for _, end in ranges]))
+    total = identity
+    for partial in partials:
+        total = merge(total, partial)
+    return total
+
+##
+# @brief: Standard deviation of a file computed by a pool of worker processes
+# @param path: Path to the input file
+# @param jobs: Number of worker processes, defaults to the number of CPUs
+# @return: Standard deviation of numbers from the file
+#
+def parallel_standard_deviation(path, jobs=None):
+    count, _, m2 = sharded_reduce(path, jobs, running_statistics, merge_statistics, (0, 0.0, 0.0))
+    return standard_deviation_from_m2(count, m2)
+
+##
+# @brief: Summary statistics of a file in one pass, computed by a pool of worker processes
+# @param path: Path to the input file
+# @param jobs: Number of worker processes, defaults to the number of CPUs
+# @return: Dictionary of summary_from_moments
+#
+def parallel_summary(path, jobs=None):
+    return summary_from_moments(sharded_reduce(path, jobs, running_moments, merge_moments,
+                                               (0, 0.0, 0.0, 0.0, 0.0, None, None)))
+
+# Number of bytes parsed at once from a memory-mapped file
+MMAP_WINDOW = 1 << 16
+
+_WHITESPACE = re.compile(rb"\s")
+
+##
+# @brief: Reads numbers from a memory-mapped file into a compact array of doubles
+# @param path: Path to the input file
+# @return: array('d') holding 8 bytes per number instead of a list of float objects
+#
+def read_mmap(path):
+    data = array("d")
+    with open(path, "rb") as handle:
+        if os.fstat(handle.fileno()).st_size == 0:
+            return data
+        with mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            size = len(mapped)
+            position = 0
+            while position < size:
+                # Parse one window at a time, ending it on whitespace so that no number is split
+                end = min(position + MMAP_WINDOW, size)
+                if end < size:
+                    match = _WHITESPACE.search(mapped, end)
+                    end = match.start() if match else size
+                data.extend(map(float, mapped[position:end].split()))
+                position = end
+    return data
+
+##
+# @brief: Standard deviation of a memory-mapped file
+# @param path: Path to the input file
+# @param backend: One of BACKENDS, NumPy reduces the array without copying it
+# @return: Standard deviation of numbers from the file
+#
+def mmap_standard_deviation(path, backend="auto"):
+    data = read_mmap(path)
+    if select_backend(backend) == "numpy":
+        values = numpy.frombuffer(data, dtype=numpy.float64)
+        deviations = values - values.mean() if values.size else values
+        return standard_deviation_from_m2(values.size, float(numpy.dot(deviations, deviations)))
+    count, mean, m2 = running_statistics(data)
+    return standard_deviation_from_m2(count, m2)
+
+##
+# @brief: Vectorized standard deviation using NumPy array reductions
+# @param stream: Text stream with whitespace separated numbers
+# @return: Standard deviation of numbers from the stream
+#
+def numpy_standard_deviation(stream):
+    # Parse the whole input into a contiguous float64 array; unlike numpy.fromstring, a malformed token raises
+    # ValueError as in the pure-Python backend instead of silently ending the data
+    data = numpy.array(stream.read().split(), dtype=numpy.float64)
+    if data.size == 0:
+        raise ValueError("No input data")
+    mean = data.mean()
+    deviations = data - mean
+    m2 = float(numpy.dot(deviations, deviations))
+    return standard_deviation_from_m2(data.size, m2)
+
+##
+# @brief: Resolves the backend to use for the two-pass computation
+# @param name: One of BACKENDS
+# @return: "numpy" or "python"
+#
+def select_backend(name="auto"):
+    if name not in BACKENDS:
+        raise ValueError("Unknown backend: " + name)
+    if name == "python":
+        return "python"
+    if numpy is None:
+        if name == "numpy":
+            print("NumPy is not installed, using the python backend", file=sys.stderr)
+        return "python"
+    return "numpy"
+
+##
+# @brief: Retrieving data from input text stream
+# @param stream: Text stream with whitespace separated numbers
+# @return: List of numbers
+#
+def read_data(stream):
+    data = []
+    for line in stream:
+        for num in line.split():
+            data.append(float(num))
+    return data
+
+##
+# @brief: Parsing arguments, printing result of standard deviation of standard input to standard output
+# @param argv: Command line arguments, defaults to sys.argv
+#
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sample standard deviation of numbers read from a file or standard input.")
+    parser.add_argument("file", nargs="?",
+                        help="input file, processed in parallel shards; standard input is used when omitted")
+    parser.add_argument("-j", "--jobs", type=int, default=None,
+                        help="number of worker processes for file input, 0 or omitted uses all CPUs")
+    parser.add_argument("--mmap", action="store_true",
+                        help="memory-map the input file and parse it into a compact array of doubles")
+    parser.add_argument("--stream", action="store_true",
+                        help="single pass with constant memory (Welford's online algorithm), for standard input; "
+                             "file input is always read in a single pass per shard")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE,
+                        help="number of characters read at once in streaming mode")
+    parser.add_argument("--backend", choices=BACKENDS, default="auto",
+                        help="computation backend for standard input and --mmap, numpy falls back to python when NumPy "
+                             "is not installed; sharded file input always uses python")
+    parser.add_argument("--summary", action="store_true",
+                        help="print count, min, max, mean, variance, stddev, skewness and excess kurtosis as one JSON "
+                             "object, computed in a single pass; --backend is ignored")
+    parser.add_argument("--profile", metavar="PREFIX",
+                        help="profile the run with cProfile and tracemalloc, writing PREFIX.pstats, PREFIX.cpu.txt "
+                             "and PREFIX.alloc.txt; file input then defaults to one process")
+    parser.add_argument("--profile-top", type=int, default=PROFILE_TOP,
+                        help="number of functions and allocation sites in the profile summaries")
+    args = parser.parse_args(argv)
+    if args.mmap and not args.file:
+        parser.error("--mmap requires an input file")
+    if args.jobs is not None and args.jobs < 0:
+        parser.error("--jobs must be a positive number of worker processes or 0 for all CPUs")
+    # Sharded file input has a single pure-Python path, flags selecting another one would be ignored
+    if args.file and args.stream:
+        parser.error("--stream applies to standard input, file input is already read in one pass per shard")
+    if args.file and not args.mmap and not args.summary and args.backend != "auto":
+        parser.error("--backend applies to standard input and --mmap, not to sharded file input")
+    # Worker processes are not seen by the profiler
+    if args.profile and args.jobs is None:
+        args.jobs = 1
+
+    with profiled(args.profile, args.profile_top):
+        if args.summary:
+            if args.mmap:
+                summary = summary_from_moments(running_moments(read_mmap(args.file)))
+            elif args.file:
+                summary = parallel_summary(args.file, args.jobs)
+            else:
+                summary = summary_from_moments(running_moments(iter_numbers(sys.stdin, args.chunk_size)))
+        elif args.mmap:
+            std_dev = mmap_standard_deviation(args.file, args.backend)
+        elif args.file:
+            std_dev = parallel_standard_deviation(args.file, args.jobs)
+        elif args.stream:
+            std_dev = streaming_standard_deviation(sys.stdin, args.chunk_size)
+        elif select_backend(args.backend) == "numpy":
+            std_dev = numpy_standard_deviation(sys.stdin)
+        else:
+            data = read_data(sys.stdin) # Kept referenced, so that the allocation summary shows it
+            std_dev = standard_deviation(data)
+    print(json.dumps(summary) if args.summary else std_dev)
+
 
-std_dev = standard_deviation(data)
-print(std_dev)
+if __name__ == "__main__":
+    main()